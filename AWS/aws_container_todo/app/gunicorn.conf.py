@@ -0,0 +1,69 @@
+# Gunicorn settings for the container: a master process supervising one Uvicorn worker per CPU
+# Single-process mode (development): uvicorn main:app --reload
+import json
+import math
+import os
+import sys
+import urllib.request
+
+def available_cpus():
+    # Fargate reports the task CPU limit in the ECS task metadata (e.g. 0.5 for Cpu: 512)
+    metadata_uri = os.environ.get("ECS_CONTAINER_METADATA_URI_V4")
+    if metadata_uri:
+        try:
+            with urllib.request.urlopen(f"{metadata_uri}/task", timeout=1) as resp:
+                limit = json.load(resp).get("Limits", {}).get("CPU")
+            if limit:
+                return max(1, math.ceil(float(limit)))
+        except (OSError, ValueError):
+            pass
+    # cgroup v2, then v1 CPU quota (docker --cpus, Kubernetes limits)
+    for quota_file, period_file in (("/sys/fs/cgroup/cpu.max", None),
+                                    ("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "/sys/fs/cgroup/cpu/cpu.cfs_period_us")):
+        try:
+            with open(quota_file) as f:
+                values = f.read().split()
+            if period_file:
+                with open(period_file) as f:
+                    values.append(f.read().strip())
+            quota, period = values[0], values[1]
+            if quota not in ("max", "-1"):
+                return max(1, math.ceil(int(quota) / int(period)))
+        except (OSError, ValueError, IndexError):
+            continue
+    # No quota: the CPUs this process may run on
+    return len(os.sched_getaffinity(0))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '80')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+# WEB_CONCURRENCY overrides the detected CPU count. The GET /tasks cache is per worker: with more than
+# one worker and no TASKS_CACHE_REDIS_URL, a read after a write may hit another worker's stale page, so
+# TASKS_CACHE_TTL defaults to 0 there (see when_ready)
+workers = int(os.environ.get("WEB_CONCURRENCY", "0")) or available_cpus()
+
+# Import main.py once in the master: workers fork with the code already loaded. Pools, the DB
+# bootstrap and background tasks start in each worker's startup event, so nothing is shared.
+preload_app = True
+
+# ECS sends SIGTERM and waits stopTimeout (30s) before SIGKILL: workers stop accepting, finish
+# in-flight requests and run the shutdown handlers (coalescer drain, pool close) within this window
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "25"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+# Longer than the ALB idle timeout (60s) so the ALB closes idle connections first
+keepalive = int(os.environ.get("KEEPALIVE", "65"))
+
+accesslog = None
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info")
+
+def when_ready(server):
+    # server.cfg holds the effective settings, command-line overrides included
+    cfg = server.cfg
+    print(f"[gunicorn] Serving on {', '.join(cfg.bind)} with {cfg.workers} worker(s)")
+    if cfg.workers > 1 and not os.environ.get("TASKS_CACHE_REDIS_URL") and "TASKS_CACHE_TTL" not in os.environ:
+        # Workers fork after this hook: the env covers a non-preloaded app, the patch the preloaded module
+        os.environ["TASKS_CACHE_TTL"] = "0"
+        if "main" in sys.modules:
+            sys.modules["main"].tasks_cache.ttl = 0
+        print("[gunicorn] GET /tasks cache disabled: per-worker caches without Redis could serve stale pages "
+              "after a write (set TASKS_CACHE_TTL or TASKS_CACHE_REDIS_URL to override)")
@@ -1,79 +1,1215 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import base64
+import binascii
+import bisect
+import collections
+import contextvars
+import gzip
+import hashlib
+import json
 import os
+import random
+import sqlite3
+import threading
 import mysql.connector
+from mysql.connector.constants import ClientFlag
 import time
 import uvicorn
+import zlib
+
+try:
+    import aiomysql
+    from pymysql.constants import CLIENT
+except ImportError:  # only required when DB_MODE=async
+    aiomysql = None
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only required when TASKS_CACHE_REDIS_URL is set
+    aioredis = None
+
+try:
+    import orjson
+except ImportError:  # only required when TASKS_FAST_JSON=1
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip is offered
+    brotli = None
 
 app = FastAPI(title="CloudTasks TODO API")
 
 # Database connection parameters from Environment Variables
 DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_PORT = int(os.environ.get("DB_PORT", "3306"))
 DB_USER = os.environ.get("DB_USER", "root")
 DB_PASSWORD = os.environ.get("DB_PASSWORD", "password")
 DB_NAME = os.environ.get("DB_NAME", "todos_db")
 
-def get_db_connection():
-    # Retry a few times in case MySQL is still starting
-    last_err = None
-    for _ in range(8):  # ~24s max
+# Connection pool settings (per process)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))  # max wait for a free connection
+DB_POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", "1800"))  # reopen connections older than this
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", "10"))  # ping on borrow if idle longer (0 = always)
+
+# Read replicas: comma-separated host[:port] list with the primary's credentials (empty = every read on the primary)
+DB_READ_HOSTS = [h.strip() for h in os.environ.get("DB_READ_HOSTS", "").split(",") if h.strip()]
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))  # per replica
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", "5"))
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "0"))  # seconds behind the primary; 0 = do not check
+# Read-your-writes: after a write, that client's reads stay on the primary for this many seconds (0 = off)
+READ_YOUR_WRITES_WINDOW = float(os.environ.get("READ_YOUR_WRITES_WINDOW", "0"))
+
+# GET /tasks paging and /tasks/export chunking
+TASKS_DEFAULT_LIMIT = int(os.environ.get("TASKS_DEFAULT_LIMIT", "100"))
+TASKS_MAX_LIMIT = int(os.environ.get("TASKS_MAX_LIMIT", "1000"))
+TASKS_EXPORT_CHUNK = int(os.environ.get("TASKS_EXPORT_CHUNK", "1000"))
+
+# POST /tasks/batch: max tasks per request and max rows per INSERT statement
+TASKS_BATCH_MAX = int(os.environ.get("TASKS_BATCH_MAX", "10000"))
+TASKS_BATCH_CHUNK = int(os.environ.get("TASKS_BATCH_CHUNK", "500"))
+# Bulk PATCH/DELETE: ids per UPDATE/DELETE statement, and rows per transaction when deleting by filter
+TASKS_BULK_CHUNK = int(os.environ.get("TASKS_BULK_CHUNK", "1000"))
+
+# Opt-in group commit for POST /tasks: concurrent creates share one INSERT + COMMIT
+TASKS_COALESCE = os.environ.get("TASKS_COALESCE", "0").lower() in ("1", "true", "yes")
+TASKS_COALESCE_WINDOW_MS = float(os.environ.get("TASKS_COALESCE_WINDOW_MS", "2"))
+TASKS_COALESCE_MAX = int(os.environ.get("TASKS_COALESCE_MAX", "100"))
+
+# GET /tasks response cache (TTL 0 disables it) and optional Redis shared between ECS tasks
+TASKS_CACHE_TTL = float(os.environ.get("TASKS_CACHE_TTL", "5"))
+TASKS_CACHE_MAX_ENTRIES = int(os.environ.get("TASKS_CACHE_MAX_ENTRIES", "256"))
+TASKS_CACHE_MAX_BYTES = int(os.environ.get("TASKS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TASKS_CACHE_REDIS_URL = os.environ.get("TASKS_CACHE_REDIS_URL", "")
+
+# Opt-in fast path for task lists and exports: DB rows are trusted and encoded with orjson, no pydantic pass
+TASKS_FAST_JSON = os.environ.get("TASKS_FAST_JSON", "0").lower() in ("1", "true", "yes")
+# gzip/brotli for GET /tasks and /tasks/export bodies of at least this many bytes, if the client accepts it (0 = off)
+TASKS_COMPRESS_MIN_BYTES = int(os.environ.get("TASKS_COMPRESS_MIN_BYTES", "1024"))
+TASKS_GZIP_LEVEL = int(os.environ.get("TASKS_GZIP_LEVEL", "6"))
+TASKS_BROTLI_QUALITY = int(os.environ.get("TASKS_BROTLI_QUALITY", "4"))
+
+# Background DB bootstrap: exponential backoff with jitter between attempts
+DB_INIT_BACKOFF_BASE = float(os.environ.get("DB_INIT_BACKOFF_BASE", "0.5"))
+DB_INIT_BACKOFF_MAX = float(os.environ.get("DB_INIT_BACKOFF_MAX", "30"))
+
+# Opt-in Server-Timing response header (pool wait, db, serialization, total)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+# Storage engine behind the API: "mysql" (default) or "sqlite" (embedded, WAL mode, single node)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "mysql").lower()
+if STORAGE_BACKEND not in ("mysql", "sqlite"):
+    raise RuntimeError(f"STORAGE_BACKEND must be 'mysql' or 'sqlite', got {STORAGE_BACKEND!r}")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "todos.db")
+
+# MySQL only. "sync": mysql.connector + thread pool, "async": aiomysql on the event loop
+DB_MODE = os.environ.get("DB_MODE", "sync").lower()
+if DB_MODE not in ("sync", "async"):
+    raise RuntimeError(f"DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+# --- Metrics (Prometheus text format, see GET /metrics) ---
+_metrics_lock = threading.Lock()
+_metrics = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RESPONSE_SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+def _label_str(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with _metrics_lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _metrics_lock:
+            for label_values, value in self._values.items():
+                lines.append(f"{self.name}{_label_str(list(zip(self.labels, label_values)))} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._values = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, value, *label_values):
+        with _metrics_lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[bisect.bisect_left(self.buckets, value)] += 1
+            entry[-1] += value
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _metrics_lock:
+            for label_values, entry in self._values.items():
+                pairs = list(zip(self.labels, label_values))
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), entry[:-1]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_label_str(pairs + [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_label_str(pairs)} {entry[-1]}")
+                lines.append(f"{self.name}_count{_label_str(pairs)} {cumulative}")
+        return lines
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency", LATENCY_BUCKETS, ("method", "route"))
+HTTP_RESPONSE_SIZE = Histogram("http_response_size_bytes", "HTTP response body size", RESPONSE_SIZE_BUCKETS, ("method", "route"))
+DB_CONNECT = Histogram("db_connect_duration_seconds", "Time to open a new MySQL connection", LATENCY_BUCKETS)
+DB_CONNECT_ERRORS = Counter("db_connect_errors_total", "Failed attempts to open a MySQL connection")
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Time waiting for a pooled connection", LATENCY_BUCKETS)
+DB_QUERY = Histogram("db_query_duration_seconds", "DB call latency, including pool checkout", LATENCY_BUCKETS, ("op",))
+DB_READS = Counter("db_reads_total", "DB reads by target", ("target",))
+DB_REPLICA_FAILOVERS = Counter("db_replica_failovers_total", "Replica reads retried on the primary")
+DB_INIT_ATTEMPTS = Counter("db_init_attempts_total", "DB bootstrap attempts (connect + migrate)", ("result",))
+SERIALIZE = Histogram("response_serialize_seconds", "Validation + JSON encoding of task lists", LATENCY_BUCKETS)
+
+# Per-request timings for the Server-Timing header; a dict shared with the thread pool via contextvars
+_timings = contextvars.ContextVar("timings", default=None)
+
+def record_timing(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+# Pure ASGI middleware (does not buffer streaming responses)
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        timings = {}
+        token = _timings.set(timings)
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    timings["app"] = time.perf_counter() - start
+                    value = ", ".join(f"{name};dur={secs * 1000:.2f}" for name, secs in timings.items())
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value.encode())]}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
         try:
-            return mysql.connector.connect(
-                host=DB_HOST,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                database=DB_NAME,
-                connection_timeout=5
-            )
-        except Exception as e:
-            last_err = e
-            time.sleep(3)
-    raise last_err
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _timings.reset(token)
+            # The router stores the matched route in the scope; label by template to bound cardinality
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, path, str(status))
+            HTTP_DURATION.observe(time.perf_counter() - start, method, path)
+            HTTP_RESPONSE_SIZE.observe(size, method, path)
 
-# Initialize DB (Simple check/create table)
-def init_db():
-    try:
-        print("[init_db] Waiting for MySQL...")
-        # Wait for MySQL server to be ready
-        for _ in range(10):  # ~30s max
+app.add_middleware(MetricsMiddleware)
+
+def open_db_connection(host=DB_HOST, port=DB_PORT):
+    # Single attempt, used by the pool: a request should fail fast instead of sleeping
+    return mysql.connector.connect(
+        host=host,
+        port=port,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME,
+        connection_timeout=5,
+        # UPDATE reports matched rows, not only changed ones (same as SQLite)
+        client_flags=[ClientFlag.FOUND_ROWS],
+    )
+
+class PoolTimeout(Exception):
+    pass
+
+# The server could not be reached (as opposed to a pool timeout, which only means it is busy)
+class DatabaseUnavailable(HTTPException):
+    def __init__(self, error):
+        super().__init__(status_code=503, detail=f"Database unavailable: {error}")
+
+# Bounded, thread-safe pool of MySQL connections shared by the whole process
+class ConnectionPool:
+    def __init__(self, connect, size, timeout, recycle, ping_after):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (conn, created_at, released_at)
+        self._created = {}  # id(conn) -> created_at
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_pings = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        with self._cond:
+            self._waiting += 1
             try:
-                conn = mysql.connector.connect(
-                    host=DB_HOST,
-                    user=DB_USER,
-                    password=DB_PASSWORD,
-                    connection_timeout=5
-                )
-                conn.ping(reconnect=True, attempts=3, delay=2)
-                break
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()  # LIFO keeps a hot subset of connections
+                        break
+                    if self._open < self.size:
+                        self._open += 1  # reserve a slot, connect outside the lock
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(f"No free DB connection after {self.timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - start
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        DB_POOL_WAIT.observe(waited)
+        record_timing("pool", waited)
+
+        try:
+            if entry is not None:
+                conn = self._check(*entry)
+                if conn is not None:
+                    return conn
+            connect_start = time.monotonic()
+            try:
+                conn = self._connect()
             except Exception:
-                time.sleep(3)
+                DB_CONNECT_ERRORS.inc()
+                raise
+            connected = time.monotonic()
+            DB_CONNECT.observe(connected - connect_start)
+            record_timing("connect", connected - connect_start)
+            self._created[id(conn)] = connected
+            return conn
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _check(self, conn, created_at, released_at):
+        # Returns a usable connection or None (after closing the stale one)
+        now = time.monotonic()
+        if now - created_at > self.recycle:
+            self._recycled += 1
+        elif now - released_at < self.ping_after:
+            return conn
         else:
-            raise RuntimeError("MySQL no responde tras los reintentos")
+            try:
+                conn.ping(reconnect=False)
+                return conn
+            except Exception:
+                self._failed_pings += 1
+        self._close(conn)
+        return None
 
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-        conn.close()
+    def _close(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def release(self, conn, discard=False):
+        if not discard and conn.unread_result:
+            # Abandoned server-side cursor: draining it could mean reading millions of rows
+            discard = True
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction (stale snapshot / locks)
+                if conn.in_transaction:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._open -= 1
+            else:
+                self._idle.append((conn, self._created.get(id(conn), 0.0), time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close(conn)
+
+    def close_all(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "failed_pings": self._failed_pings,
+                "wait_time_total_s": round(self._wait_total, 6),
+                "wait_time_avg_ms": round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "wait_time_max_ms": round(self._wait_max * 1000, 3),
+            }
 
-        conn = get_db_connection()
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Created lazily so every worker process gets its own pool
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(open_db_connection, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+                                       DB_POOL_RECYCLE, DB_POOL_PING_AFTER)
+    return _pool
+
+@contextmanager
+def db_connection(pool=None):
+    pool = pool or get_pool()
+    try:
+        conn = pool.acquire()
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except mysql.connector.Error as e:
+        raise DatabaseUnavailable(e)
+    try:
+        yield conn
+    except mysql.connector.errors.InterfaceError:
+        # Broken socket: drop the connection instead of returning it to the pool
+        pool.release(conn, discard=True)
+        raise
+    except BaseException:
+        pool.release(conn)
+        raise
+    else:
+        pool.release(conn)
+
+# --- Async pool (DB_MODE=async) ---
+_aio_pool = None
+_aio_stats = {"checkouts": 0, "timeouts": 0, "wait_total": 0.0, "wait_max": 0.0}
+
+async def create_aio_pool(host, port, size):
+    if aiomysql is None:
+        raise RuntimeError("DB_MODE=async requires the aiomysql package")
+    # minsize=0: connections are opened on demand, so startup does not depend on MySQL
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME,
+        minsize=0,
+        maxsize=size,
+        pool_recycle=int(DB_POOL_RECYCLE),
+        connect_timeout=5,
+        autocommit=True,
+        client_flag=CLIENT.FOUND_ROWS,
+    )
+
+async def open_aio_pool():
+    global _aio_pool
+    _aio_pool = await create_aio_pool(DB_HOST, DB_PORT, DB_POOL_SIZE)
+
+async def close_aio_pool():
+    if _aio_pool is not None:
+        _aio_pool.close()
+        await _aio_pool.wait_closed()
+
+def aio_pool_stats():
+    pool = _aio_pool
+    checkouts = _aio_stats["checkouts"]
+    return {
+        "size": DB_POOL_SIZE,
+        "open": pool.size if pool else 0,
+        "in_use": pool.size - pool.freesize if pool else 0,
+        "idle": pool.freesize if pool else 0,
+        "checkouts": checkouts,
+        "timeouts": _aio_stats["timeouts"],
+        "wait_time_total_s": round(_aio_stats["wait_total"], 6),
+        "wait_time_avg_ms": round(_aio_stats["wait_total"] / checkouts * 1000, 3) if checkouts else 0.0,
+        "wait_time_max_ms": round(_aio_stats["wait_max"] * 1000, 3),
+    }
+
+@asynccontextmanager
+async def aio_db_connection(pool=None):
+    pool = pool or _aio_pool
+    start = time.monotonic()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), DB_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        _aio_stats["timeouts"] += 1
+        raise HTTPException(status_code=503, detail=f"No free DB connection after {DB_POOL_TIMEOUT}s")
+    except (OSError, aiomysql.Error) as e:
+        DB_CONNECT_ERRORS.inc()
+        raise DatabaseUnavailable(e)
+    waited = time.monotonic() - start
+    _aio_stats["checkouts"] += 1
+    _aio_stats["wait_total"] += waited
+    _aio_stats["wait_max"] = max(_aio_stats["wait_max"], waited)
+    # aiomysql opens connections inside acquire(), so this includes connect time for new ones
+    DB_POOL_WAIT.observe(waited)
+    record_timing("pool", waited)
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+# --- Query helpers shared by both modes ---
+# Writes are a list of (sql, params) run in a single transaction; each returns (lastrowid, rowcount)
+
+def _sync_fetchall(sql, params, pool=None):
+    with db_connection(pool) as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    return rows
+
+def _sync_write(statements):
+    with db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        results = []
+        for sql, params in statements:
+            cursor.execute(sql, params)
+            results.append((cursor.lastrowid, cursor.rowcount))
+        conn.commit()
+        cursor.close()
+    return results
+
+def _sync_stream(sql, params, chunk_size, pool=None):
+    with db_connection(pool) as conn:
+        cursor = conn.cursor(dictionary=True)  # unbuffered: rows are read from the socket on demand
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+        cursor.close()
+
+async def _aio_fetchall(sql, params, pool=None):
+    async with aio_db_connection(pool) as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+async def _aio_write(statements):
+    async with aio_db_connection() as conn:
+        await conn.begin()
+        try:
+            results = []
+            async with conn.cursor() as cursor:
+                for sql, params in statements:
+                    await cursor.execute(sql, params)
+                    results.append((cursor.lastrowid, cursor.rowcount))
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+    return results
+
+async def _aio_stream(sql, params, chunk_size, pool=None):
+    async with aio_db_connection(pool) as conn:
+        done = False
+        try:
+            cursor = await conn.cursor(aiomysql.SSDictCursor)
+            await cursor.execute(sql, params)
+            while True:
+                rows = await cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            await cursor.close()
+            done = True
+        finally:
+            if not done:
+                # Client went away mid-stream: drop the connection rather than drain the result
+                conn.close()
+
+# --- Read replicas (DB_READ_HOSTS) ---
+# GET handlers read from a healthy replica (round robin); writes, migrations and pinned reads use the primary
+
+# Errors that mean the replica itself is gone, not that the query or the pool is at fault
+REPLICA_DOWN_ERRORS = (DatabaseUnavailable, mysql.connector.errors.InterfaceError,
+                       mysql.connector.errors.OperationalError, OSError)
+if aiomysql is not None:
+    REPLICA_DOWN_ERRORS += (aiomysql.InterfaceError, aiomysql.OperationalError)
+
+def parse_host(value):
+    host, _, port = value.partition(":")
+    return host, int(port or DB_PORT)
+
+class Replica:
+    def __init__(self, host, port):
+        self.name = f"{host}:{port}"
+        self.host = host
+        self.port = port
+        self.pool = ConnectionPool(lambda: open_db_connection(host, port), DB_READ_POOL_SIZE,
+                                   DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PING_AFTER)
+        self.aio_pool = None
+        self.healthy = False  # until the first health check passes
+        self.lag = None
+        self.last_error = None
+        self.reads = 0
+
+    async def fetchall(self, sql, params=()):
+        if DB_MODE == "async":
+            return await _aio_fetchall(sql, params, self.aio_pool)
+        return await run_in_threadpool(_sync_fetchall, sql, params, self.pool)
+
+    def pool_stats(self):
+        if DB_MODE == "async":
+            pool = self.aio_pool
+            return {"open": pool.size if pool else 0, "idle": pool.freesize if pool else 0}
+        return self.pool.stats()
+
+class ReplicaSet:
+    def __init__(self, hosts):
+        self.replicas = [Replica(*parse_host(h)) for h in hosts]
+        self._next = 0
+        self._task = None
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def pick(self):
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    def mark_down(self, replica, error):
+        if replica.healthy:
+            print(f"[replicas] {replica.name} unavailable, reading from the primary: {error}")
+        replica.healthy = False
+        replica.last_error = str(error)
+
+    async def start(self):
+        if not self.replicas:
+            return
+        if DB_MODE == "async":
+            for replica in self.replicas:
+                replica.aio_pool = await create_aio_pool(replica.host, replica.port, DB_READ_POOL_SIZE)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        for replica in self.replicas:
+            replica.pool.close_all()
+            if replica.aio_pool is not None:
+                replica.aio_pool.close()
+                await replica.aio_pool.wait_closed()
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(self._check(r) for r in self.replicas))
+            await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+
+    async def _check(self, replica):
+        try:
+            if DB_REPLICA_MAX_LAG > 0:
+                rows = await replica.fetchall("SHOW REPLICA STATUS")
+                lag = rows[0].get("Seconds_Behind_Source") if rows else None
+                if lag is None:
+                    raise RuntimeError("replication is not running")
+                if lag > DB_REPLICA_MAX_LAG:
+                    raise RuntimeError(f"{lag}s behind the primary (max {DB_REPLICA_MAX_LAG:g}s)")
+                replica.lag = lag
+            else:
+                await replica.fetchall("SELECT 1")
+        except Exception as e:
+            self.mark_down(replica, e.detail if isinstance(e, HTTPException) else e)
+            return
+        if not replica.healthy:
+            print(f"[replicas] {replica.name} healthy, serving reads")
+        replica.healthy = True
+        replica.last_error = None
+
+    def stats(self):
+        return [
+            {"host": r.name, "healthy": r.healthy, "lag_s": r.lag, "last_error": r.last_error,
+             "reads": r.reads, "pool": r.pool_stats()}
+            for r in self.replicas
+        ]
+
+replicas = ReplicaSet(DB_READ_HOSTS)
+
+@asynccontextmanager
+async def timed_db_call(op):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        DB_QUERY.observe(elapsed, op)
+        record_timing("db", elapsed)
+
+async def db_fetchall(sql, params=(), replica=False):
+    async with timed_db_call("read"):
+        target = replicas.pick() if replica else None
+        if target is not None:
+            try:
+                rows = await target.fetchall(sql, params)
+                target.reads += 1
+                DB_READS.inc("replica")
+                return rows
+            except REPLICA_DOWN_ERRORS as e:
+                replicas.mark_down(target, e.detail if isinstance(e, HTTPException) else e)
+                DB_REPLICA_FAILOVERS.inc()
+            except HTTPException:
+                # Replica pool exhausted: serve this read from the primary, the replica stays in rotation
+                DB_REPLICA_FAILOVERS.inc()
+        DB_READS.inc("primary")
+        if DB_MODE == "async":
+            return await _aio_fetchall(sql, params)
+        return await run_in_threadpool(_sync_fetchall, sql, params)
+
+async def db_write(statements):
+    async with timed_db_call("write"):
+        if DB_MODE == "async":
+            return await _aio_write(statements)
+        return await run_in_threadpool(_sync_write, statements)
+
+async def _stream_rows(sql, params, chunk_size, target=None):
+    if DB_MODE == "async":
+        async for rows in _aio_stream(sql, params, chunk_size, target.aio_pool if target else None):
+            yield rows
+        return
+    gen = _sync_stream(sql, params, chunk_size, target.pool if target else None)
+    try:
+        async for rows in iterate_in_threadpool(gen):
+            yield rows
+    finally:
+        await run_in_threadpool(gen.close)
+
+async def db_stream(sql, params=(), chunk_size=TASKS_EXPORT_CHUNK, replica=False):
+    # Yields lists of rows from a server-side cursor, holding one connection for the whole stream.
+    # Like db_fetchall, a replica failing before the first chunk gives way to the primary; after
+    # that the error propagates, since part of the response is already sent.
+    target = replicas.pick() if replica else None
+    if target is not None:
+        stream = _stream_rows(sql, params, chunk_size, target)
+        try:
+            first = await stream.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except REPLICA_DOWN_ERRORS as e:
+            replicas.mark_down(target, e.detail if isinstance(e, HTTPException) else e)
+            DB_REPLICA_FAILOVERS.inc()
+            target = None
+        except HTTPException:
+            # Replica pool exhausted: stream from the primary, the replica stays in rotation
+            DB_REPLICA_FAILOVERS.inc()
+            target = None
+        if target is not None:
+            target.reads += 1
+            DB_READS.inc("replica")
+            try:
+                if first is not None:
+                    yield first
+                    async for rows in stream:
+                        yield rows
+            finally:
+                await stream.aclose()
+            return
+    DB_READS.inc("primary")
+    stream = _stream_rows(sql, params, chunk_size)
+    try:
+        async for rows in stream:
+            yield rows
+    finally:
+        await stream.aclose()
+
+# Schema migrations: applied once, in order, and recorded in schema_migrations
+MYSQL_MIGRATIONS = [
+    (1, [
+        """
             CREATE TABLE IF NOT EXISTS tasks (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 title VARCHAR(255) NOT NULL,
                 description TEXT,
                 completed BOOLEAN DEFAULT FALSE
             )
+        """,
+    ]),
+    # Indexes behind the GET /tasks filters: completed + keyset on id, and title prefix
+    (2, [
+        "CREATE INDEX idx_tasks_completed_id ON tasks (completed, id)",
+        "CREATE INDEX idx_tasks_title ON tasks (title)",
+    ]),
+]
+
+ER_DUP_KEYNAME = 1061
+
+def migrate_mysql():
+    conn = mysql.connector.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        connection_timeout=5
+    )
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+        conn.database = DB_NAME
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
         """)
-        conn.commit()
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {version for (version,) in cursor.fetchall()}
+        for version, statements in MYSQL_MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"[init_db] Applying schema migration {version}...")
+            for sql in statements:
+                try:
+                    cursor.execute(sql)
+                except mysql.connector.Error as e:
+                    # CREATE INDEX has no IF NOT EXISTS in MySQL; tolerate a concurrent/partial run
+                    if e.errno != ER_DUP_KEYNAME:
+                        raise
+            # IGNORE: another task may have applied the same migration concurrently
+            cursor.execute("INSERT IGNORE INTO schema_migrations (version) VALUES (%s)", (version,))
+            conn.commit()
+        cursor.close()
+    finally:
         conn.close()
-        print("[init_db] Database and table ready.")
-    except Exception as e:
-        print(f"[init_db] Error initializing DB: {e}")
+
+# --- Storage backends ---
+# Handlers only talk to a task repository: list_tasks, count_tasks, insert_tasks, stream_tasks,
+# update_tasks, delete_tasks, delete_matching, plus start/close, migrate (sync, run in the thread
+# pool), ping and pool_stats. Bulk writes return affected row counts and never load the rows.
+
+TASK_COLUMNS = "id, title, description, completed"
+INSERT_TASKS_SQL = "INSERT INTO tasks (title, description, completed) VALUES "
+
+def insert_tasks_statement(tasks, placeholder="%s"):
+    # One multi-row INSERT for the whole chunk
+    row = f"({placeholder}, {placeholder}, {placeholder})"
+    sql = INSERT_TASKS_SQL + ", ".join([row] * len(tasks))
+    params = [v for t in tasks for v in (t.title, t.description, t.completed)]
+    return sql, params
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def update_tasks_statements(ids, changes, chunk_size, placeholder="%s"):
+    # One UPDATE ... WHERE id IN (...) per chunk; `changes` keys are TaskPatch field names
+    sets = ", ".join(f"{column} = {placeholder}" for column in changes)
+    return [
+        (f"UPDATE tasks SET {sets} WHERE id IN ({', '.join([placeholder] * len(chunk))})", [*changes.values(), *chunk])
+        for chunk in chunked(ids, chunk_size)
+    ]
+
+def delete_tasks_statements(ids, chunk_size, placeholder="%s"):
+    return [
+        (f"DELETE FROM tasks WHERE id IN ({', '.join([placeholder] * len(chunk))})", list(chunk))
+        for chunk in chunked(ids, chunk_size)
+    ]
+
+class MySQLTaskRepository:
+    name = "mysql"
+    schema_version = MYSQL_MIGRATIONS[-1][0]
+
+    def __init__(self):
+        self._auto_increment_step = None
+
+    async def start(self):
+        if DB_MODE == "async":
+            await open_aio_pool()
+        await replicas.start()
+
+    async def close(self):
+        await replicas.close()
+        if _pool is not None:
+            _pool.close_all()
+        await close_aio_pool()
+
+    def migrate(self):
+        migrate_mysql()
+
+    async def ping(self):
+        await db_fetchall("SELECT 1")
+
+    def pool_stats(self):
+        stats = aio_pool_stats() if DB_MODE == "async" else get_pool().stats()
+        if replicas.enabled:
+            stats["replicas"] = replicas.stats()
+        return {"mode": DB_MODE, **stats}
+
+    # Reads go to a replica unless `consistent` pins them to the primary
+    async def list_tasks(self, filters, after_id, limit, consistent=False):
+        clauses, params = filters.where()
+        clauses.append("id > %s")
+        return await db_fetchall(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE {' AND '.join(clauses)} ORDER BY id LIMIT %s",
+            (*params, after_id, limit),
+            replica=not consistent,
+        )
+
+    async def count_tasks(self, filters, estimate, consistent=False):
+        if estimate and filters.is_empty():
+            # InnoDB statistics: O(1) but approximate
+            [row] = await db_fetchall(
+                "SELECT TABLE_ROWS AS n FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'tasks'",
+                (DB_NAME,),
+                replica=not consistent,
+            )
+            return int(row["n"] or 0), True
+        clauses, params = filters.where()
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        [row] = await db_fetchall(f"SELECT COUNT(*) AS n FROM tasks{where}", params, replica=not consistent)
+        return int(row["n"]), False
+
+    async def insert_tasks(self, tasks):
+        chunks = chunked(tasks, TASKS_BATCH_CHUNK)
+        results = await db_write([insert_tasks_statement(chunk) for chunk in chunks])
+        step = await self._step()
+        ids = []
+        for chunk, (first_id, _) in zip(chunks, results):
+            ids.extend(first_id + i * step for i in range(len(chunk)))
+        return ids
+
+    async def update_tasks(self, ids, changes):
+        results = await db_write(update_tasks_statements(ids, changes, TASKS_BULK_CHUNK))
+        return sum(rowcount for _, rowcount in results)
+
+    async def delete_tasks(self, ids):
+        results = await db_write(delete_tasks_statements(ids, TASKS_BULK_CHUNK))
+        return sum(rowcount for _, rowcount in results)
+
+    async def delete_matching(self, filters):
+        # One short transaction per TASKS_BULK_CHUNK rows, so purging a large set never holds long locks
+        clauses, params = filters.where()
+        sql = f"DELETE FROM tasks WHERE {' AND '.join(clauses)} ORDER BY id LIMIT %s"
+        deleted = 0
+        while True:
+            [(_, rowcount)] = await db_write([(sql, (*params, TASKS_BULK_CHUNK))])
+            deleted += rowcount
+            if rowcount < TASKS_BULK_CHUNK:
+                return deleted
+
+    async def _step(self):
+        # A multi-row INSERT reports the first id; the rest are spaced by auto_increment_increment
+        # (InnoDB reserves consecutive values for inserts whose row count is known up front)
+        if self._auto_increment_step is None:
+            [row] = await db_fetchall("SELECT @@auto_increment_increment AS step")
+            self._auto_increment_step = int(row["step"])
+        return self._auto_increment_step
+
+    async def stream_tasks(self, filters, chunk_size, consistent=False):
+        clauses, params = filters.where()
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {TASK_COLUMNS} FROM tasks{where} ORDER BY id"
+        async for rows in db_stream(sql, params, chunk_size, replica=not consistent):
+            yield rows
+
+SQLITE_MIGRATIONS = [
+    (1, [
+        # NOCASE on title mirrors MySQL's case-insensitive collation and lets LIKE 'prefix%' use the index
+        """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL COLLATE NOCASE CHECK (length(title) <= 255),
+                description TEXT,
+                completed INTEGER NOT NULL DEFAULT 0
+            )
+        """,
+    ]),
+    (2, [
+        "CREATE INDEX IF NOT EXISTS idx_tasks_completed_id ON tasks (completed, id)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_title ON tasks (title)",
+    ]),
+]
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+# Embedded backend for single-node/edge deployments and fast local runs. WAL lets readers run
+# concurrently with the (single) writer; each thread-pool thread keeps its own connection.
+class SQLiteTaskRepository:
+    name = "sqlite"
+    schema_version = SQLITE_MIGRATIONS[-1][0]
+    # 3 parameters per row keeps each INSERT under SQLITE_MAX_VARIABLE_NUMBER (999 on older builds)
+    MAX_ROWS_PER_INSERT = 300
+    MAX_IDS_PER_STATEMENT = 900  # plus up to 3 SET values
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conns = []
+        self._conns_lock = threading.Lock()
+        self._write_lock = threading.Lock()  # queue writers in-process instead of spinning on SQLITE_BUSY
+
+    def _open(self):
+        # isolation_level=None: autocommit, writes use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.path, timeout=DB_POOL_TIMEOUT, isolation_level=None, check_same_thread=False)
+        conn.row_factory = _dict_row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe against corruption in WAL mode
+        return conn
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+    def migrate(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        applied = {row["version"] for row in conn.execute("SELECT version FROM schema_migrations")}
+        for version, statements in SQLITE_MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"[init_db] Applying SQLite schema migration {version}...")
+            with self._write_lock:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for sql in statements:
+                        conn.execute(sql)
+                    conn.execute("INSERT OR IGNORE INTO schema_migrations (version) VALUES (?)", (version,))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+
+    def pool_stats(self):
+        with self._conns_lock:
+            open_conns = len(self._conns)
+        return {"path": self.path, "open": open_conns}
+
+    def _fetchall(self, sql, params):
+        return self._conn().execute(sql, params).fetchall()
+
+    async def _read(self, sql, params=()):
+        async with timed_db_call("read"):
+            return await run_in_threadpool(self._fetchall, sql, params)
+
+    async def ping(self):
+        await self._read("SELECT 1")
+
+    async def list_tasks(self, filters, after_id, limit, consistent=False):
+        clauses, params = filters.where("?")
+        clauses.append("id > ?")
+        return await self._read(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?",
+            (*params, after_id, limit),
+        )
+
+    async def count_tasks(self, filters, estimate, consistent=False):
+        # No cheap statistics in SQLite; COUNT(*) walks the smallest index
+        clauses, params = filters.where("?")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        [row] = await self._read(f"SELECT COUNT(*) AS n FROM tasks{where}", params)
+        return int(row["n"]), False
+
+    def _insert(self, tasks):
+        conn = self._conn()
+        ids = []
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for chunk in chunked(tasks, self.MAX_ROWS_PER_INSERT):
+                    cursor = conn.execute(*insert_tasks_statement(chunk, "?"))
+                    # Rows of one statement get consecutive rowids while we hold the write lock
+                    last_id = cursor.lastrowid
+                    ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    async def insert_tasks(self, tasks):
+        async with timed_db_call("write"):
+            return await run_in_threadpool(self._insert, tasks)
+
+    def _execute(self, statements):
+        # One write transaction; returns the rowcount of each statement
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                counts = [conn.execute(sql, params).rowcount for sql, params in statements]
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return counts
+
+    async def _write(self, statements):
+        async with timed_db_call("write"):
+            return await run_in_threadpool(self._execute, statements)
+
+    async def update_tasks(self, ids, changes):
+        chunk_size = min(TASKS_BULK_CHUNK, self.MAX_IDS_PER_STATEMENT)
+        return sum(await self._write(update_tasks_statements(ids, changes, chunk_size, "?")))
+
+    async def delete_tasks(self, ids):
+        chunk_size = min(TASKS_BULK_CHUNK, self.MAX_IDS_PER_STATEMENT)
+        return sum(await self._write(delete_tasks_statements(ids, chunk_size, "?")))
+
+    async def delete_matching(self, filters):
+        # SQLite builds usually lack DELETE ... LIMIT: bound each transaction through the primary key
+        clauses, params = filters.where("?")
+        sql = f"DELETE FROM tasks WHERE id IN (SELECT id FROM tasks WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?)"
+        deleted = 0
+        while True:
+            [rowcount] = await self._write([(sql, (*params, TASKS_BULK_CHUNK))])
+            deleted += rowcount
+            if rowcount < TASKS_BULK_CHUNK:
+                return deleted
+
+    def _stream(self, sql, params, chunk_size):
+        # Dedicated connection: the generator hops between threads and may outlive the request
+        conn = self._open()
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    async def stream_tasks(self, filters, chunk_size, consistent=False):
+        clauses, params = filters.where("?")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        gen = self._stream(f"SELECT {TASK_COLUMNS} FROM tasks{where} ORDER BY id", params, chunk_size)
+        try:
+            async for rows in iterate_in_threadpool(gen):
+                yield rows
+        finally:
+            await run_in_threadpool(gen.close)
+
+def make_repository():
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteTaskRepository(SQLITE_PATH)
+    return MySQLTaskRepository()
+
+tasks_repo = make_repository()
+
+db_status = {"schema_version": None, "attempts": 0, "last_error": None}
+
+async def init_db():
+    # Runs in the background so the app starts serving /healthz immediately
+    attempt = 0
+    while True:
+        attempt += 1
+        db_status["attempts"] = attempt
+        try:
+            await run_in_threadpool(tasks_repo.migrate)
+        except Exception as e:
+            DB_INIT_ATTEMPTS.inc("error")
+            # Capped exponent: the float product would overflow after ~1000 attempts and kill the task
+            backoff = min(DB_INIT_BACKOFF_MAX, DB_INIT_BACKOFF_BASE * 2 ** min(attempt - 1, 16))
+            delay = backoff / 2 + random.uniform(0, backoff / 2)
+            db_status["last_error"] = str(e)
+            print(f"[init_db] Attempt {attempt} failed: {e}. Retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            continue
+        DB_INIT_ATTEMPTS.inc("ok")
+        db_status["schema_version"] = tasks_repo.schema_version
+        db_status["last_error"] = None
+        print(f"[init_db] {tasks_repo.name} ready (schema version {tasks_repo.schema_version}).")
+        return
+
+_init_task = None
+
+@app.on_event("startup")
+async def startup_event():
+    global _init_task
+    _init_task = asyncio.ensure_future(init_db())
 
 @app.on_event("startup")
-def startup_event():
-    init_db()
+async def startup_storage():
+    await tasks_repo.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if _init_task is not None:
+        _init_task.cancel()
+    # Flush buffered creates while the pools are still open
+    if _coalescer is not None:
+        await _coalescer.drain()
+    await tasks_repo.close()
+    if tasks_cache.shared is not None:
+        await tasks_cache.shared.close()
 
 class Task(BaseModel):
     title: str
@@ -83,27 +1219,687 @@ class Task(BaseModel):
 class TaskOut(Task):
     id: int
 
+# PATCH bodies: only the fields sent are changed
+class TaskPatch(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+
+class TaskBulkPatch(TaskPatch):
+    ids: List[int]
+
+class TaskIds(BaseModel):
+    ids: List[int]
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to CloudTasks API"}
 
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving, regardless of the database
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    # Readiness: schema migrated and the database answering right now
+    if db_status["schema_version"] != tasks_repo.schema_version:
+        return JSONResponse(status_code=503, content={"ready": False, **db_status})
+    try:
+        await tasks_repo.ping()
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        return JSONResponse(status_code=503, content={"ready": False, "error": detail})
+    return {"ready": True, "backend": tasks_repo.name, "schema_version": tasks_repo.schema_version}
+
+def _gauge(name, help, value, kind="gauge"):
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.expose())
+    pool = tasks_repo.pool_stats()
+    lines += _gauge("db_pool_size", "Max connections per process", pool.get("size", 0))
+    lines += _gauge("db_pool_open", "Open connections", pool.get("open", 0))
+    lines += _gauge("db_pool_in_use", "Connections checked out", pool.get("in_use", 0))
+    lines += _gauge("db_pool_idle", "Idle connections", pool.get("idle", 0))
+    lines += _gauge("db_pool_timeouts_total", "Checkouts that timed out", pool.get("timeouts", 0), "counter")
+    lines += _gauge("db_pool_recycled_total", "Connections closed for age", pool.get("recycled", 0), "counter")
+    lines += _gauge("db_pool_failed_pings_total", "Connections dropped by the borrow health check", pool.get("failed_pings", 0), "counter")
+    if replicas.enabled:
+        lines += _gauge("db_replicas_healthy", "Read replicas currently serving reads", sum(r.healthy for r in replicas.replicas))
+    cache = tasks_cache.stats()
+    lines += _gauge("tasks_cache_hits_total", "Task list cache hits", cache["hits"] + cache["shared_hits"], "counter")
+    lines += _gauge("tasks_cache_misses_total", "Task list cache misses", cache["misses"], "counter")
+    lines += _gauge("tasks_cache_bytes", "Bytes held by the task list cache", cache["bytes"])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/pool/stats")
+def pool_stats():
+    return {"backend": tasks_repo.name, **tasks_repo.pool_stats()}
+
+def encode_cursor(last_id):
+    raw = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return int(json.loads(raw)["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid 'after' cursor")
+
+def task_row(row):
+    # MySQL returns BOOLEAN as 0/1
+    row["completed"] = bool(row["completed"])
+    return row
+
+TaskList = TypeAdapter(List[TaskOut])
+
+def encode_tasks_checked(rows):
+    # Validates every row against TaskOut, then encodes in pydantic-core
+    return TaskList.dump_json(TaskList.validate_python(rows))
+
+def encode_tasks_fast(rows):
+    # Rows come straight from our own SELECT: only the 0/1 booleans need fixing
+    return orjson.dumps([task_row(r) for r in rows])
+
+def encode_task_fast(row):
+    return orjson.dumps(task_row(row))
+
+def encode_task_checked(row):
+    return json.dumps(task_row(row)).encode()
+
+if TASKS_FAST_JSON and orjson is None:
+    raise RuntimeError("TASKS_FAST_JSON=1 requires the orjson package")
+encode_tasks = encode_tasks_fast if TASKS_FAST_JSON else encode_tasks_checked
+encode_task = encode_task_fast if TASKS_FAST_JSON else encode_task_checked
+
+# --- Response compression ---
+
+def negotiate_encoding(accept_encoding):
+    # br when both sides support it, else gzip; q=0 rules a coding out
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, param = part.partition(";")
+        param = param.strip().replace(" ", "")
+        if param.startswith("q="):
+            try:
+                if float(param[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=TASKS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=TASKS_GZIP_LEVEL, mtime=0)
+
+def stream_compressor(encoding):
+    # (compress, flush) pair for chunked responses
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=TASKS_BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(TASKS_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return compressor.compress, compressor.flush
+
+async def compressed_stream(chunks, encoding):
+    compress, flush = stream_compressor(encoding)
+    async for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield flush()
+
+# Bodies above this are compressed in the thread pool instead of on the event loop
+COMPRESS_INLINE_MAX = 64 * 1024
+
+# A cached GET /tasks page: serialized body plus what is needed to rebuild the headers.
+# `encoded` memoizes compressed variants of the body by Content-Encoding (not counted in the cache
+# byte budget: they are a fraction of the body).
+CachedPage = collections.namedtuple("CachedPage", "body etag next_cursor encoded")
+
+def make_page(body, next_cursor):
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    return CachedPage(body, etag, next_cursor, {})
+
+# Shared generation counter + pages in Redis, so every ECS task sees the same invalidations
+class RedisPageStore:
+    GENERATION_KEY = "todo:tasks:generation"
+
+    def __init__(self, url, ttl):
+        if aioredis is None:
+            raise RuntimeError("TASKS_CACHE_REDIS_URL requires the redis package")
+        self._redis = aioredis.from_url(url)
+        self.ttl = ttl
+
+    async def generation(self):
+        return int(await self._redis.get(self.GENERATION_KEY) or 0)
+
+    async def bump(self):
+        return await self._redis.incr(self.GENERATION_KEY)
+
+    async def get(self, generation, key):
+        raw = await self._redis.get(f"todo:tasks:{generation}:{key}")
+        if raw is None:
+            return None
+        etag, next_cursor, body = raw.split(b"\n", 2)
+        return CachedPage(body, etag.decode(), next_cursor.decode() or None, {})
+
+    async def put(self, generation, key, page):
+        raw = page.etag.encode() + b"\n" + (page.next_cursor or "").encode() + b"\n" + page.body
+        await self._redis.set(f"todo:tasks:{generation}:{key}", raw, px=int(self.ttl * 1000))
+
+    async def close(self):
+        await self._redis.aclose()
+
+# In-process LRU of serialized task-list pages, bounded by entries and bytes. Entries are keyed by
+# a generation that every write through the API bumps, so a page read before a write is never
+# served after it.
+class TaskListCache:
+    def __init__(self, ttl, max_entries, max_bytes, shared=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._entries = collections.OrderedDict()  # (generation, key) -> (page, expires_at)
+        self._bytes = 0
+        self._generation = 0
+        self._hits = 0
+        self._shared_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._shared_errors = 0
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    async def generation(self):
+        # None means "do not cache" (shared backend unreachable)
+        if self.shared is None:
+            return self._generation
+        try:
+            generation = await self.shared.generation()
+        except Exception as e:
+            self._shared_errors += 1
+            print(f"[cache] Shared backend error: {e}")
+            return None
+        if generation != self._generation:
+            self._generation = generation
+            self._clear()
+        return generation
+
+    async def get(self, generation, key):
+        entry = self._entries.get((generation, key))
+        if entry is not None:
+            page, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end((generation, key))
+                self._hits += 1
+                return page
+            self._drop((generation, key))
+        if self.shared is not None:
+            try:
+                page = await self.shared.get(generation, key)
+            except Exception as e:
+                self._shared_errors += 1
+                print(f"[cache] Shared backend error: {e}")
+                page = None
+            if page is not None:
+                self._shared_hits += 1
+                self._store(generation, key, page)
+                return page
+        self._misses += 1
+        return None
+
+    async def put(self, generation, key, page):
+        self._store(generation, key, page)
+        if self.shared is not None:
+            try:
+                await self.shared.put(generation, key, page)
+            except Exception as e:
+                self._shared_errors += 1
+                print(f"[cache] Shared backend error: {e}")
+
+    async def invalidate(self):
+        self._generation += 1
+        self._clear()
+        if self.shared is not None:
+            try:
+                self._generation = await self.shared.bump()
+            except Exception as e:
+                self._shared_errors += 1
+                print(f"[cache] Shared backend error: {e}")
+
+    def _store(self, generation, key, page):
+        if len(page.body) > self.max_bytes:
+            return
+        if generation != self._generation:
+            return  # a write happened while this page was being read
+        self._drop((generation, key))
+        self._entries[(generation, key)] = (page, time.monotonic() + self.ttl)
+        self._bytes += len(page.body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._evictions += 1
+
+    def _drop(self, entry_key):
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0].body)
+
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "shared": self.shared is not None,
+            "ttl_s": self.ttl,
+            "generation": self._generation,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "shared_hits": self._shared_hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "shared_errors": self._shared_errors,
+        }
+
+tasks_cache = TaskListCache(TASKS_CACHE_TTL, TASKS_CACHE_MAX_ENTRIES, TASKS_CACHE_MAX_BYTES)
+
+@app.on_event("startup")
+async def startup_cache():
+    if TASKS_CACHE_REDIS_URL and tasks_cache.enabled:
+        tasks_cache.shared = RedisPageStore(TASKS_CACHE_REDIS_URL, TASKS_CACHE_TTL)
+
+async def invalidate_tasks_cache():
+    if tasks_cache.enabled:
+        await tasks_cache.invalidate()
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or "W/" + etag in candidates
+
+# '!' instead of backslash: same ESCAPE literal works in MySQL and SQLite
+def escape_like(value):
+    return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+# Server-side filters for the task list; every combination is served by the PK or an index from migration 2
+class TaskFilter:
+    def __init__(self, completed=None, title_prefix=None, id_min=None, id_max=None):
+        self.completed = completed
+        self.title_prefix = title_prefix
+        self.id_min = id_min
+        self.id_max = id_max
+
+    def where(self, placeholder="%s"):
+        clauses, params = [], []
+        if self.completed is not None:
+            clauses.append(f"completed = {placeholder}")
+            params.append(self.completed)
+        if self.title_prefix:
+            clauses.append(f"title LIKE {placeholder} ESCAPE '!'")
+            params.append(escape_like(self.title_prefix) + "%")
+        if self.id_min is not None:
+            clauses.append(f"id >= {placeholder}")
+            params.append(self.id_min)
+        if self.id_max is not None:
+            clauses.append(f"id <= {placeholder}")
+            params.append(self.id_max)
+        return clauses, params
+
+    def is_empty(self):
+        return not self.where()[0]
+
+    def cache_key(self):
+        return f"{self.completed}:{self.title_prefix or ''}:{self.id_min}:{self.id_max}"
+
+def task_filter(completed: Optional[bool] = None,
+                title_prefix: Optional[str] = Query(None, min_length=1, max_length=255),
+                id_min: Optional[int] = Query(None, ge=0),
+                id_max: Optional[int] = Query(None, ge=0)):
+    return TaskFilter(completed, title_prefix, id_min, id_max)
+
+async def load_tasks_page(filters, last_id, limit, consistent):
+    rows = await tasks_repo.list_tasks(filters, last_id, limit + 1, consistent)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["id"])
+    start = time.perf_counter()
+    body = encode_tasks(rows)
+    elapsed = time.perf_counter() - start
+    SERIALIZE.observe(elapsed)
+    record_timing("ser", elapsed)
+    return make_page(body, next_cursor)
+
+async def load_tasks_count(filters, estimate, consistent):
+    count, estimated = await tasks_repo.count_tasks(filters, estimate, consistent)
+    return make_page(json.dumps({"count": count, "estimate": estimated}).encode(), None)
+
+async def cached_page(key, load, refresh=False):
+    # refresh: skip the lookup (the entry may have been filled from a lagging replica) but store the result
+    generation = await tasks_cache.generation() if tasks_cache.enabled else None
+    page = await tasks_cache.get(generation, key) if generation is not None and not refresh else None
+    if page is None:
+        page = await load()
+        if generation is not None:
+            await tasks_cache.put(generation, key, page)
+    return page
+
+async def page_response(request, page, extra_headers=None):
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+    encoding = None
+    if TASKS_COMPRESS_MIN_BYTES > 0:
+        headers["Vary"] = "Accept-Encoding"
+        if len(page.body) >= TASKS_COMPRESS_MIN_BYTES:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is not None:
+        # Each representation gets its own strong validator
+        headers["ETag"] = f'{page.etag[:-1]}-{encoding}"'
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    headers.update(extra_headers or {})
+    body = page.body
+    if encoding is not None:
+        body = page.encoded.get(encoding)
+        if body is None:
+            start = time.perf_counter()
+            if len(page.body) > COMPRESS_INLINE_MAX:
+                body = await run_in_threadpool(compress_body, page.body, encoding)
+            else:
+                body = compress_body(page.body, encoding)
+            record_timing("zip", time.perf_counter() - start)
+            page.encoded[encoding] = body
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Read-your-writes: a write sets a cookie holding the end of the client's window; until then its reads
+# skip the replicas and the page cache. Clients without cookies can send X-Read-Consistency: strong.
+RYW_COOKIE = "todo_ryw"
+
+def read_consistent(request: Request):
+    if request.headers.get("x-read-consistency", "").lower() == "strong":
+        return True
+    until = request.cookies.get(RYW_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+def pin_reads_to_primary(response):
+    if READ_YOUR_WRITES_WINDOW > 0 and replicas.enabled:
+        response.set_cookie(RYW_COOKIE, f"{time.time() + READ_YOUR_WRITES_WINDOW:.3f}",
+                            max_age=int(READ_YOUR_WRITES_WINDOW) + 1, httponly=True, samesite="lax")
+
 @app.get("/tasks", response_model=List[TaskOut])
-def get_tasks():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM tasks")
-    tasks = cursor.fetchall()
-    conn.close()
-    return tasks
+async def get_tasks(request: Request,
+                    limit: int = Query(TASKS_DEFAULT_LIMIT, ge=1, le=TASKS_MAX_LIMIT),
+                    after: Optional[str] = None,
+                    filters: TaskFilter = Depends(task_filter),
+                    consistent: bool = Depends(read_consistent)):
+    # Keyset pagination on the primary key; the next page cursor goes in headers so the body stays a list
+    last_id = decode_cursor(after) if after else 0
+    key = f"list:{limit}:{last_id}:{filters.cache_key()}"
+    page = await cached_page(key, lambda: load_tasks_page(filters, last_id, limit, consistent), consistent)
+    headers = {}
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+        next_url = request.url.include_query_params(limit=limit, after=page.next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return await page_response(request, page, headers)
+
+@app.get("/tasks/count")
+async def count_tasks(request: Request, estimate: bool = False,
+                      filters: TaskFilter = Depends(task_filter),
+                      consistent: bool = Depends(read_consistent)):
+    # COUNT(*) over the narrowest index; estimate=true reads table statistics instead (unfiltered only)
+    key = f"count:{estimate}:{filters.cache_key()}"
+    page = await cached_page(key, lambda: load_tasks_count(filters, estimate, consistent), consistent)
+    return await page_response(request, page)
+
+@app.get("/cache/stats")
+def cache_stats():
+    return tasks_cache.stats()
+
+@app.get("/tasks/export")
+async def export_tasks(request: Request,
+                       format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+                       filters: TaskFilter = Depends(task_filter),
+                       consistent: bool = Depends(read_consistent)):
+    # Full dump with flat memory: rows are encoded chunk by chunk as they come off the cursor
+
+    async def ndjson():
+        async for rows in tasks_repo.stream_tasks(filters, TASKS_EXPORT_CHUNK, consistent):
+            yield b"".join(encode_task(r) + b"\n" for r in rows)
+
+    async def json_array():
+        first = True
+        yield b"["
+        async for rows in tasks_repo.stream_tasks(filters, TASKS_EXPORT_CHUNK, consistent):
+            chunk = b",".join(encode_task(r) for r in rows)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+
+    body, media_type = (json_array(), "application/json") if format == "json" else (ndjson(), "application/x-ndjson")
+    headers = {}
+    # Size is unknown up front, so any export is worth compressing
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if TASKS_COMPRESS_MIN_BYTES > 0 else None
+    if encoding is not None:
+        body = compressed_stream(body, encoding)
+        headers = {"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+# Buffers single-task creates for up to `window` seconds or `max_rows` rows and
+# flushes them as one multi-row INSERT; each caller awaits its own id
+class WriteCoalescer:
+    SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+    def __init__(self, window, max_rows):
+        self.window = window
+        self.max_rows = max_rows
+        self._pending = []  # (task, future, enqueued_at)
+        self._timer = None
+        self._inflight = set()
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._failed_batches = 0
+        self._size_hist = [0] * (len(self.SIZE_BUCKETS) + 1)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._flush_total = 0.0
+
+    async def submit(self, task):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((task, future, time.monotonic()))
+        if len(self._pending) >= self.max_rows:
+            self._flush_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_pending)
+        return await future
+
+    def _flush_pending(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            flush = asyncio.ensure_future(self._flush(batch))
+            self._inflight.add(flush)
+            flush.add_done_callback(self._inflight.discard)
+
+    async def _flush(self, batch):
+        _timings.set(None)  # this task runs in a copy of one caller's context; don't bill it the flush
+        started = time.monotonic()
+        try:
+            ids = await tasks_repo.insert_tasks([task for task, _, _ in batch])
+        except Exception as e:
+            self._failed_batches += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        await invalidate_tasks_cache()
+        for (_, future, _), new_id in zip(batch, ids):
+            # A cancelled caller (client gone) still got its row written
+            if not future.done():
+                future.set_result(new_id)
+        self._record(batch, started)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        self._batches += 1
+        self._rows += size
+        self._max_batch = max(self._max_batch, size)
+        bucket = next((i for i, b in enumerate(self.SIZE_BUCKETS) if size <= b), len(self.SIZE_BUCKETS))
+        self._size_hist[bucket] += 1
+        for _, _, enqueued_at in batch:
+            waited = started - enqueued_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        self._flush_total += time.monotonic() - started
+
+    async def drain(self):
+        self._flush_pending()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def stats(self):
+        labels = [f"<={b}" for b in self.SIZE_BUCKETS] + [f">{self.SIZE_BUCKETS[-1]}"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_rows": self.max_rows,
+            "pending": len(self._pending),
+            "inflight_batches": len(self._inflight),
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "rows": self._rows,
+            "batch_size_avg": round(self._rows / self._batches, 2) if self._batches else 0.0,
+            "batch_size_max": self._max_batch,
+            "batch_size_hist": dict(zip(labels, self._size_hist)),
+            "added_latency_avg_ms": round(self._wait_total / self._rows * 1000, 3) if self._rows else 0.0,
+            "added_latency_max_ms": round(self._wait_max * 1000, 3),
+            "flush_time_avg_ms": round(self._flush_total / self._batches * 1000, 3) if self._batches else 0.0,
+        }
+
+_coalescer = None
+
+def get_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = WriteCoalescer(TASKS_COALESCE_WINDOW_MS / 1000, TASKS_COALESCE_MAX)
+    return _coalescer
+
+@app.get("/coalescer/stats")
+def coalescer_stats():
+    if not TASKS_COALESCE:
+        return {"enabled": False}
+    return {"enabled": True, **get_coalescer().stats()}
 
 @app.post("/tasks", response_model=TaskOut)
-def create_task(task: Task):
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    sql = "INSERT INTO tasks (title, description, completed) VALUES (%s, %s, %s)"
-    val = (task.title, task.description, task.completed)
-    cursor.execute(sql, val)
-    conn.commit()
-    new_id = cursor.lastrowid
-    conn.close()
+async def create_task(task: Task, response: Response):
+    if TASKS_COALESCE:
+        new_id = await get_coalescer().submit(task)
+    else:
+        [new_id] = await tasks_repo.insert_tasks([task])
+        await invalidate_tasks_cache()
+    pin_reads_to_primary(response)
     return {**task.dict(), "id": new_id}
+
+@app.post("/tasks/batch", response_model=List[TaskOut])
+async def create_tasks_batch(tasks: List[Task], response: Response):
+    if len(tasks) > TASKS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {TASKS_BATCH_MAX} tasks per batch")
+    if not tasks:
+        return []
+    # Chunked multi-row INSERTs, all committed in a single transaction
+    ids = await tasks_repo.insert_tasks(tasks)
+    await invalidate_tasks_cache()
+    pin_reads_to_primary(response)
+    return [{**task.dict(), "id": new_id} for task, new_id in zip(tasks, ids)]
+
+def task_changes(patch):
+    changes = patch.dict(exclude_unset=True, exclude={"ids"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    for field in ("title", "completed"):
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=422, detail=f"'{field}' cannot be null")
+    return changes
+
+def check_bulk_ids(ids):
+    if len(ids) > TASKS_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {TASKS_BATCH_MAX} ids per request")
+
+@app.patch("/tasks/{task_id}", response_model=TaskOut)
+async def update_task(task_id: int, patch: TaskPatch, response: Response):
+    changes = task_changes(patch)
+    if not await tasks_repo.update_tasks([task_id], changes):
+        raise HTTPException(status_code=404, detail="Task not found")
+    await invalidate_tasks_cache()
+    pin_reads_to_primary(response)
+    rows = await tasks_repo.list_tasks(TaskFilter(id_min=task_id, id_max=task_id), 0, 1, consistent=True)
+    if not rows:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task_row(rows[0])
+
+@app.delete("/tasks/{task_id}", status_code=204)
+async def delete_task(task_id: int):
+    if not await tasks_repo.delete_tasks([task_id]):
+        raise HTTPException(status_code=404, detail="Task not found")
+    await invalidate_tasks_cache()
+    response = Response(status_code=204)
+    pin_reads_to_primary(response)
+    return response
+
+# Bulk variants: set-based UPDATE/DELETE in chunks, answering with the affected row count
+@app.patch("/tasks")
+async def update_tasks(patch: TaskBulkPatch, response: Response):
+    check_bulk_ids(patch.ids)
+    changes = task_changes(patch)
+    updated = await tasks_repo.update_tasks(patch.ids, changes) if patch.ids else 0
+    if updated:
+        await invalidate_tasks_cache()
+        pin_reads_to_primary(response)
+    return {"updated": updated}
+
+@app.post("/tasks/delete")
+async def delete_tasks(body: TaskIds, response: Response):
+    check_bulk_ids(body.ids)
+    deleted = await tasks_repo.delete_tasks(body.ids) if body.ids else 0
+    if deleted:
+        await invalidate_tasks_cache()
+        pin_reads_to_primary(response)
+    return {"deleted": deleted}
+
+@app.delete("/tasks")
+async def delete_matching_tasks(response: Response, filters: TaskFilter = Depends(task_filter)):
+    # e.g. DELETE /tasks?completed=true purges finished tasks
+    if filters.is_empty():
+        raise HTTPException(status_code=400, detail="Refusing to delete every task: pass at least one filter")
+    try:
+        deleted = await tasks_repo.delete_matching(filters)
+    finally:
+        # Chunks commit separately: earlier ones are gone even if a later one fails
+        await invalidate_tasks_cache()
+    pin_reads_to_primary(response)
+    return {"deleted": deleted}
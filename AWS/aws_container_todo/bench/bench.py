@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga local para la TODO API (app/main.py).
+
+Arranca la API con uvicorn contra una base de datos local, siembra la tabla,
+lanza una carga mixta de lecturas/escrituras con N clientes concurrentes y
+escribe un informe JSON (throughput y latencias p50/p95/p99 por operacion)
+que se puede comparar entre ejecuciones con --compare.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'app')
+
+MYSQL_CONTAINER = 'todo-bench-mysql'
+MYSQL_PASSWORD = 'benchpassword'
+
+# Operations of the mixed workload: name -> (method, path builder, body builder)
+def _list_path(state):
+    return f"/tasks?limit={state['page_size']}"
+
+def _page_path(state):
+    # Random page deep in the table through the id filter (keyset, no OFFSET)
+    start = random.randint(0, max(state['rows'] - state['page_size'], 0))
+    return f"/tasks?limit={state['page_size']}&id_min={start}"
+
+def _filter_path(state):
+    return f"/tasks?limit={state['page_size']}&completed=true"
+
+def _create_body(state):
+    n = random.randint(0, 1_000_000)
+    return {"title": f"bench task {n}", "description": "load test", "completed": n % 2 == 0}
+
+def _batch_body(state):
+    return [_create_body(state) for _ in range(state['batch_size'])]
+
+OPERATIONS = {
+    'list': ('GET', _list_path, None),
+    'page': ('GET', _page_path, None),
+    'filter': ('GET', _filter_path, None),
+    'count': ('GET', lambda state: "/tasks/count", None),
+    'create': ('POST', lambda state: "/tasks", _create_body),
+    'batch': ('POST', lambda state: "/tasks/batch", _batch_body),
+}
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}' in --mix (valid: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+    }
+
+# --- Local database ---
+
+def start_mysql(port):
+    print(f"[bench] Starting {MYSQL_CONTAINER} (mysql:8.0) on port {port}...")
+    subprocess.run(['docker', 'rm', '-f', MYSQL_CONTAINER], capture_output=True)
+    subprocess.run([
+        'docker', 'run', '-d', '--rm', '--name', MYSQL_CONTAINER,
+        '-e', f'MYSQL_ROOT_PASSWORD={MYSQL_PASSWORD}',
+        '-p', f'{port}:3306', 'mysql:8.0',
+    ], check=True, capture_output=True)
+
+def stop_mysql():
+    subprocess.run(['docker', 'rm', '-f', MYSQL_CONTAINER], capture_output=True)
+
+# --- App under test ---
+
+def start_app(args, db_env, workers=None):
+    env = dict(os.environ)
+    env.update(db_env)
+    env.update(dict(kv.split('=', 1) for kv in args.app_env))
+    if workers:
+        # Production mode: gunicorn master with N Uvicorn workers (app/gunicorn.conf.py)
+        cmd = [sys.executable, '-m', 'gunicorn', 'main:app', '-c', 'gunicorn.conf.py',
+               '--bind', f'127.0.0.1:{args.port}', '--workers', str(workers), '--log-level', 'warning']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+               '--port', str(args.port), '--log-level', 'warning']
+    print(f"[bench] Starting app: {' '.join(cmd)}")
+    return subprocess.Popen(cmd, cwd=APP_DIR, env=env)
+
+def stop_app(proc):
+    if proc and proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def request(conn, method, path, body=None):
+    payload = json.dumps(body).encode() if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    conn.request(method, path, body=payload, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp.status, data
+
+def wait_ready(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            status, _ = request(conn, 'GET', '/ready')
+            conn.close()
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"[bench] App not ready after {timeout}s")
+
+def seed(host, port, rows, chunk=1000):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    status, data = request(conn, 'GET', '/tasks/count')
+    existing = json.loads(data)['count'] if status == 200 else 0
+    missing = max(rows - existing, 0)
+    print(f"[bench] Seeding {missing} tasks ({existing} already present)...")
+    while missing > 0:
+        n = min(chunk, missing)
+        body = [{"title": f"seed {i}", "description": "seed row", "completed": i % 3 == 0} for i in range(n)]
+        status, data = request(conn, 'POST', '/tasks/batch', body)
+        if status != 200:
+            raise SystemExit(f"[bench] Seeding failed: HTTP {status} {data[:200]!r}")
+        missing -= n
+    conn.close()
+
+# --- Contract check: the same API-level assertions for every storage backend ---
+
+def contract_check(host, port):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    prefix = f"contract-{random.randint(0, 10**9)}-"
+    failures = []
+
+    def check(cond, what):
+        if not cond:
+            failures.append(what)
+
+    def get_json(path):
+        status, data = request(conn, 'GET', path)
+        check(status == 200, f"GET {path} -> HTTP {status}")
+        return json.loads(data) if status == 200 else None
+
+    status, data = request(conn, 'POST', '/tasks', {"title": prefix + "single", "description": "d"})
+    single = json.loads(data)
+    check(status == 200 and isinstance(single.get('id'), int), "POST /tasks returns an id")
+
+    batch = [{"title": f"{prefix}{i:03d}", "completed": i % 2 == 0} for i in range(250)]
+    status, data = request(conn, 'POST', '/tasks/batch', batch)
+    created = json.loads(data)
+    ids = [t['id'] for t in created]
+    check(status == 200 and len(ids) == len(batch), "POST /tasks/batch returns every task")
+    check(ids == sorted(ids) and len(set(ids)) == len(ids) and ids[0] > single['id'], "batch ids are unique and in input order")
+    check([t['title'] for t in created] == [t['title'] for t in batch], "batch echoes tasks in input order")
+
+    # Walk the prefix-filtered list page by page and compare with what was written
+    q = urllib.parse.quote(prefix)
+    seen, after = [], None
+    while True:
+        path = f"/tasks?limit=40&title_prefix={q}" + (f"&after={after}" if after else "")
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        page = json.loads(resp.read())
+        seen.extend(page)
+        after = resp.getheader('X-Next-Cursor')
+        if not after:
+            break
+    check([t['id'] for t in seen] == [single['id']] + ids, "keyset pages return every row once, ordered by id")
+    check(all(t['completed'] == (int(t['title'][-3:]) % 2 == 0) for t in seen[1:]), "completed round-trips as bool")
+
+    done = get_json(f"/tasks?limit=1000&completed=true&title_prefix={q}")
+    check(done is not None and len(done) == 125 and all(t['completed'] for t in done), "completed filter")
+    ranged = get_json(f"/tasks?limit=1000&id_min={ids[10]}&id_max={ids[19]}")
+    check(ranged is not None and [t['id'] for t in ranged] == ids[10:20], "id range filter")
+    count = get_json(f"/tasks/count?title_prefix={q}")
+    check(count is not None and count['count'] == 251, "count matches the filtered list")
+    literal = get_json(f"/tasks?title_prefix={urllib.parse.quote(prefix[:-1] + '%')}")
+    check(literal == [], "LIKE wildcards in title_prefix are matched literally")
+
+    status, data = request(conn, 'GET', f"/tasks/export?title_prefix={q}")
+    lines = data.decode().splitlines()
+    check(status == 200 and len(lines) == 251 and json.loads(lines[-1])['id'] == ids[-1], "NDJSON export")
+
+    # Last page of the prefix: the next write lands on it, so its ETag must change
+    tail = f"/tasks?title_prefix={q}&id_min={ids[-1]}"
+    conn.request('GET', tail)
+    resp = conn.getresponse()
+    resp.read()
+    etag = resp.getheader('ETag')
+    conn.request('GET', tail, headers={'If-None-Match': etag})
+    resp = conn.getresponse()
+    resp.read()
+    check(etag and resp.status == 304, "If-None-Match with the current ETag -> 304")
+    request(conn, 'POST', '/tasks', {"title": prefix + "zz"})
+    conn.request('GET', tail, headers={'If-None-Match': etag})
+    resp = conn.getresponse()
+    resp.read()
+    check(resp.status == 200, "a write invalidates the cached page")
+
+    status, data = request(conn, 'PATCH', f"/tasks/{single['id']}", {"title": prefix + "renamed", "completed": True})
+    check(status == 200 and json.loads(data)['title'] == prefix + "renamed", "PATCH /tasks/{id} returns the updated task")
+    status, data = request(conn, 'PATCH', '/tasks', {"ids": ids[:100] + [ids[-1] + 10**9], "completed": True})
+    check(status == 200 and json.loads(data) == {"updated": 100}, "bulk PATCH counts matched rows")
+    count = get_json(f"/tasks/count?completed=true&title_prefix={q}")
+    check(count is not None and count['count'] == 1 + 100 + 75, "bulk PATCH is visible to reads")
+    status, _ = request(conn, 'DELETE', f"/tasks/{single['id']}")
+    check(status == 204, "DELETE /tasks/{id} -> 204")
+    status, _ = request(conn, 'DELETE', f"/tasks/{single['id']}")
+    check(status == 404, "deleting a missing task -> 404")
+    status, data = request(conn, 'POST', '/tasks/delete', {"ids": ids[:10]})
+    check(status == 200 and json.loads(data) == {"deleted": 10}, "bulk delete by ids")
+    # Also removes what the check created
+    status, data = request(conn, 'DELETE', f"/tasks?title_prefix={q}")
+    check(status == 200 and json.loads(data) == {"deleted": 241}, "DELETE /tasks?<filter> removes every match")
+
+    conn.close()
+    for failure in failures:
+        print(f"[contract] FAIL: {failure}")
+    print(f"[contract] {'OK' if not failures else f'{len(failures)} failure(s)'}")
+    return not failures
+
+# --- Load generation ---
+
+def run_load(host, port, mix, concurrency, duration, warmup, state):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    results = {n: {'latencies': [], 'errors': 0} for n in names}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + warmup + duration
+    measure_from = time.monotonic() + warmup
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port, timeout=30)  # keep-alive per client
+        local = {n: ([], 0) for n in names}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            name = random.choices(names, weights)[0]
+            method, path_fn, body_fn = OPERATIONS[name]
+            body = body_fn(state) if body_fn else None
+            start = time.perf_counter()
+            try:
+                status, _ = request(conn, method, path_fn(state), body)
+                ok = 200 <= status < 300
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+            elapsed = time.perf_counter() - start
+            if now < measure_from:
+                continue
+            lat, err = local[name]
+            if ok:
+                lat.append(elapsed)
+            else:
+                local[name] = (lat, err + 1)
+        conn.close()
+        with lock:
+            for n, (lat, err) in local.items():
+                results[n]['latencies'].extend(lat)
+                results[n]['errors'] += err
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = {n: summarize(r['latencies'], r['errors'], duration) for n, r in results.items()}
+    all_latencies = [v for r in results.values() for v in r['latencies']]
+    all_errors = sum(r['errors'] for r in results.values())
+    report['total'] = summarize(all_latencies, all_errors, duration)
+    return report
+
+def compare(current, baseline):
+    print(f"\n{'operation':<10} {'rps':>10} {'Δrps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'Δp99':>8}")
+    for name, cur in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        delta = lambda a, b: f"{(a - b) / b * 100:+.1f}%" if a is not None and b else "n/a"
+        lat = cur['latency_ms']
+        print(f"{name:<10} {cur['throughput_rps']:>10} "
+              f"{delta(cur['throughput_rps'], base['throughput_rps']) if base else 'n/a':>8} "
+              f"{lat['p50']!s:>9} {lat['p95']!s:>9} {lat['p99']!s:>9} "
+              f"{delta(lat['p99'], base['latency_ms']['p99']) if base else 'n/a':>8}")
+
+def print_scaling(runs):
+    base = runs[0]['results']['total']['throughput_rps']
+    print(f"\n{'workers':>7} {'rps':>10} {'speedup':>8} {'p50':>9} {'p99':>9}")
+    for run in runs:
+        total = run['results']['total']
+        speedup = f"{total['throughput_rps'] / base:.2f}x" if base else "n/a"
+        print(f"{run['workers']:>7} {total['throughput_rps']:>10} {speedup:>8} "
+              f"{total['latency_ms']['p50']!s:>9} {total['latency_ms']['p99']!s:>9}")
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Benchmark an already running API instead of starting one (e.g. http://127.0.0.1:8000)')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the locally started app')
+    parser.add_argument('--backend', choices=['mysql', 'sqlite'], default='mysql',
+                        help='Storage engine of the locally started app (STORAGE_BACKEND)')
+    parser.add_argument('--sqlite-path', help='SQLite file for --backend sqlite (default: a temp file)')
+    parser.add_argument('--mysql', choices=['docker', 'external'], default='docker',
+                        help='docker: start mysql:8.0 in a container; external: use --db-host/--db-port')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3307)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default=MYSQL_PASSWORD)
+    parser.add_argument('--workers', help='Serve with gunicorn and this many workers; a list (1,2,4) '
+                                          'repeats the run per count to show scaling (default: one uvicorn process)')
+    parser.add_argument('--app-env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Extra env for the app, e.g. DB_MODE=async or TASKS_COALESCE=1 (repeatable)')
+    parser.add_argument('--rows', type=int, default=10_000, help='Table size before the run')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='Unmeasured seconds before measuring')
+    parser.add_argument('--mix', default='list=50,page=20,filter=10,count=5,create=15',
+                        help=f"Weighted operations ({', '.join(OPERATIONS)})")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--contract', action='store_true',
+                        help='Run the API contract check before the load (exit 1 on failure)')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', help='Previous JSON report to compare against')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    worker_counts = [int(w) for w in args.workers.split(',')] if args.workers else [None]
+    if args.url and args.workers:
+        parser.error('--workers only applies to the locally started app')
+    app_proc = None
+    started_mysql = False
+    runs = []
+    try:
+        if args.url:
+            parsed = urllib.parse.urlparse(args.url)
+            host, port = parsed.hostname, parsed.port or 80
+        else:
+            host, port = '127.0.0.1', args.port
+            if args.backend == 'sqlite':
+                sqlite_path = args.sqlite_path or os.path.join(tempfile.mkdtemp(prefix='todo-bench-'), 'todos.db')
+                db_env = {'STORAGE_BACKEND': 'sqlite', 'SQLITE_PATH': sqlite_path}
+            else:
+                if args.mysql == 'docker':
+                    start_mysql(args.db_port)
+                    started_mysql = True
+                db_env = {
+                    'STORAGE_BACKEND': 'mysql',
+                    'DB_HOST': args.db_host,
+                    'DB_PORT': str(args.db_port),
+                    'DB_USER': args.db_user,
+                    'DB_PASSWORD': args.db_password,
+                    'DB_NAME': 'todos_bench',
+                }
+        for workers in worker_counts:
+            if not args.url:
+                app_proc = start_app(args, db_env, workers)
+            wait_ready(host, port, timeout=180)
+            if args.contract and not runs and not contract_check(host, port):
+                raise SystemExit(1)
+            seed(host, port, args.rows)
+
+            state = {'rows': args.rows, 'page_size': args.page_size, 'batch_size': args.batch_size}
+            print(f"[bench] Running {args.mix} with {args.concurrency} clients for {args.duration}s "
+                  f"(+{args.warmup}s warmup){f', {workers} worker(s)' if workers else ''}...")
+            results = run_load(host, port, mix, args.concurrency, args.duration, args.warmup, state)
+            runs.append({'workers': workers, 'results': results})
+            stop_app(app_proc)
+            app_proc = None
+    finally:
+        stop_app(app_proc)
+        if started_mysql:
+            stop_mysql()
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'revision': git_revision(),
+        'config': {
+            'target': args.url or 'local',
+            'backend': None if args.url else args.backend,
+            'app_env': args.app_env,
+            'rows': args.rows,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'mix': mix,
+            'page_size': args.page_size,
+            'batch_size': args.batch_size,
+            'workers': worker_counts if args.workers else None,
+        },
+        # With several worker counts, 'results' is the last run (used by --compare)
+        'results': runs[-1]['results'],
+    }
+    if len(runs) > 1:
+        report['runs'] = runs
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"[bench] Report written to {args.output}")
+    else:
+        print(text)
+    if len(runs) > 1:
+        print_scaling(runs)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == '__main__':
+    main()
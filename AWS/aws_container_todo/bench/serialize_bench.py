@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de serializacion de listas de tareas (sin base de datos ni HTTP).
+
+Compara, para listas de N filas tal como salen del cursor (completed como 0/1):
+  fastapi_default  validacion response_model + jsonable_encoder + json.dumps
+  checked          TypeAdapter de pydantic (ruta por defecto de GET /tasks)
+  fast             orjson sobre las filas de confianza (TASKS_FAST_JSON=1)
+y el coste y tamano de gzip/brotli sobre el cuerpo resultante.
+
+Requiere las dependencias de app/requirements.txt.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), 'app'))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+import main as todo_app  # noqa: E402
+
+def make_rows(n):
+    return [{"id": i + 1, "title": f"task {i}", "description": "load test row" if i % 4 else None,
+             "completed": i % 2} for i in range(n)]
+
+def fastapi_default(rows):
+    # What a response_model=List[TaskOut] endpoint returning the rows does
+    validated = todo_app.TaskList.validate_python(rows)
+    content = jsonable_encoder(todo_app.TaskList.dump_python(validated, mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+ENCODERS = {
+    'fastapi_default': fastapi_default,
+    'checked': todo_app.encode_tasks_checked,
+}
+if todo_app.orjson is not None:
+    ENCODERS['fast'] = todo_app.encode_tasks_fast
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, {'median_ms': round(statistics.median(samples) * 1000, 3),
+                    'min_ms': round(min(samples) * 1000, 3)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='10000,100000', help='Comma-separated list sizes')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args()
+
+    encodings = ['gzip'] + (['br'] if todo_app.brotli is not None else [])
+    report = {}
+    print(f"{'rows':>7} {'path':<16} {'median ms':>10} {'min ms':>9} {'bytes':>10} {'vs default':>10}")
+    for n in [int(r) for r in args.rows.split(',')]:
+        results = {}
+        for name, encode in ENCODERS.items():
+            # Fresh rows per path: the fast path normalizes them in place
+            rows = make_rows(n)
+            body, timing = timeit(lambda: encode(rows), args.repeat)
+            results[name] = {**timing, 'bytes': len(body)}
+        base = results['fastapi_default']['median_ms']
+        for name, r in results.items():
+            print(f"{n:>7} {name:<16} {r['median_ms']:>10} {r['min_ms']:>9} {r['bytes']:>10} "
+                  f"{base / r['median_ms']:>9.1f}x")
+        body = (todo_app.encode_tasks_fast if 'fast' in ENCODERS else todo_app.encode_tasks_checked)(make_rows(n))
+        for encoding in encodings:
+            compressed, timing = timeit(lambda: todo_app.compress_body(body, encoding), args.repeat)
+            results[encoding] = {**timing, 'bytes': len(compressed), 'ratio': round(len(compressed) / len(body), 3)}
+            print(f"{n:>7} {'+' + encoding:<16} {timing['median_ms']:>10} {timing['min_ms']:>9} {len(compressed):>10}")
+        report[n] = results
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -14,14 +14,25 @@ for item in items:
 
 # Verificar API
 print('\nProbando API:')
+import urllib.parse
 import urllib.request
 try:
     url = 'https://ghqub7cfdb.execute-api.us-east-1.amazonaws.com/items'
-    req = urllib.request.Request(url)
-    with urllib.request.urlopen(req, timeout=5) as response:
-        data = json.loads(response.read().decode('utf-8'))
-        print(f'API respondio: {len(data)} items')
-        for item in data[:3]:
-            print(f"  {item}")
+    data = []
+    pages = 0
+    next_token = None
+    # La API pagina: se siguen las paginas mientras venga la cabecera X-Next-Token
+    while True:
+        query = {'limit': 1000, **({'next': next_token} if next_token else {})}
+        req = urllib.request.Request(f'{url}?{urllib.parse.urlencode(query)}')
+        with urllib.request.urlopen(req, timeout=5) as response:
+            data.extend(json.loads(response.read().decode('utf-8')))
+            next_token = response.headers.get('X-Next-Token')
+        pages += 1
+        if not next_token:
+            break
+    print(f'API respondio: {len(data)} items en {pages} pagina(s)')
+    for item in data[:3]:
+        print(f"  {item}")
 except Exception as e:
     print(f'Error en API: {e}')
@@ -0,0 +1,219 @@
+"""
+Comprobacion local de load_inventory (sin llamadas a AWS): genera al vuelo un CSV sintetico
+de varios GB (tambien comprimido en varios miembros gzip / frames zstd), lo lee con open_rows, el
+mismo camino que usa la Lambda, a traves de un S3 falso, y verifica que la memoria maxima del
+proceso no crece con el tamano del fichero. Antes comprueba que reanudar desde el checkpoint de
+cualquier fila (CSV y NDJSON, plano, .gz y .zst) da las mismas filas, y que un salto que no llega
+al checkpoint antes del deadline falla con un error.
+
+    python check_load.py --gb 2 --max-mb 64
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import zlib
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')  # the module creates its clients at import
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lambdas', 'load_inventory'))
+import lambda_function as load_inventory  # noqa: E402
+
+MEMBER_SIZE = 8 * 1024 * 1024  # plain bytes per gzip member / zstd frame, like the parts of export.py
+SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def compressor(codec):
+    # Returns (compress, flush); flush() ends the current gzip member / zstd frame
+    if codec == 'gzip':
+        obj = zlib.compressobj(1, zlib.DEFLATED, 31)
+    else:
+        obj = load_inventory.zstandard.ZstdCompressor(level=1).compressobj()
+    return obj.compress, obj.flush
+
+def compress(data, codec, member_size):
+    members = []
+    for i in range(0, len(data), member_size):
+        add, flush = compressor(codec)
+        members.append(add(data[i:i + member_size]) + flush())
+    return b''.join(members)
+
+class SyntheticBody:
+    # Stands in for the S3 StreamingBody: yields `size` bytes of CSV without ever holding the file,
+    # compressed on the fly in members of MEMBER_SIZE plain bytes when a codec is given
+    def __init__(self, size, codec=None, stores=50):
+        self.size = size
+        self.codec = codec
+        self.header = 'Store,Item,Count\n'.encode()
+        # One ~1 MB block of rows (with multi-byte characters) repeated until `size` is reached
+        rows = ''.join(f'Tienda {i % stores},Artículo {i},{i % 20}\n' for i in range(30000))
+        self.block = rows.encode('utf-8')
+
+    def plain_chunks(self, chunk_size):
+        yield self.header
+        sent = len(self.header)
+        pending = b''
+        while sent < self.size:
+            while len(pending) < chunk_size:
+                pending += self.block
+            chunk, pending = pending[:chunk_size], pending[chunk_size:]
+            chunk = chunk[:self.size - sent]
+            sent += len(chunk)
+            yield chunk
+
+    def iter_chunks(self, chunk_size):
+        if not self.codec:
+            yield from self.plain_chunks(chunk_size)
+            return
+        add, flush = compressor(self.codec)
+        member = 0
+        for chunk in self.plain_chunks(chunk_size):
+            data = add(chunk)
+            member += len(chunk)
+            if member >= MEMBER_SIZE:
+                data += flush()
+                add, flush = compressor(self.codec)
+                member = 0
+            if data:
+                yield data
+        yield flush()
+
+    def close(self):
+        pass
+
+class BytesBody:
+    def __init__(self, data):
+        self.data = data
+
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+class FakeS3:
+    # get_object as open_rows uses it: honours Range and IfMatch and records the ranges requested
+    etag = '"check"'
+
+    def __init__(self):
+        self.objects = {}
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        assert IfMatch in (None, self.etag)
+        self.ranges.append(Range)
+        data = self.objects[Key]
+        if isinstance(data, SyntheticBody):
+            return {'Body': data, 'ContentLength': data.size, 'ETag': self.etag}
+        start = int(Range[len('bytes='):-1]) if Range else 0
+        return {'Body': BytesBody(data[start:]), 'ContentLength': len(data) - start, 'ETag': self.etag}
+
+class Deadline:
+    # Lambda context that is always past the checkpoint margin
+    def get_remaining_time_in_millis(self):
+        return 0
+
+s3 = FakeS3()
+load_inventory.s3 = s3
+
+def read(job, context=None):
+    # Rows from open_rows plus the checkpoint load_object would save after each of them
+    reader, position, _ = load_inventory.open_rows(job, context)
+    rows, points = [], []
+    for row in reader:
+        rows.append(row)
+        points.append(load_inventory.resume_point(reader, position, job.get('offset', 0)))
+    return rows, points
+
+def samples():
+    # BOM, CRLF, quoted newlines and multi-byte text
+    csv_data = ('\ufeffStore,Item,Count\r\n'
+                + ''.join(f'T{i % 3},"Art\nículo {i}",{i}\r\n' for i in range(200))).encode()
+    ndjson = ''.join(json.dumps({'store': f'T{i % 3}', 'item': f'Artículo {i}', 'count': i}, ensure_ascii=False) + '\n'
+                     for i in range(200)).encode()
+    return {'csv': csv_data, 'ndjson': ndjson}
+
+def check_resume():
+    # Resuming at every checkpoint must reproduce the rows of a single pass. Members of ~700 bytes
+    # start mid-line and mid-character, and resumes must read from a later member, not from byte 0.
+    codecs = [None, 'gzip'] + (['zstd'] if load_inventory.zstandard is not None else [])
+    for fmt, data in samples().items():
+        for codec in codecs:
+            key = f'feed.{fmt}{SUFFIXES[codec]}'
+            s3.objects[key] = compress(data, codec, 700) if codec else data
+            job = {'bucket': 'check', 'key': key}
+            expected, points = read(job)
+            s3.ranges.clear()
+            for i, point in enumerate(points[:-1]):
+                rest, _ = read({'bucket': 'check', 'key': key, 'etag': job['etag'], **point})
+                if rest != expected[i + 1:]:
+                    print(f'FAIL: {key}: resuming at {point} (after row {i + 1}) gives different rows')
+                    sys.exit(1)
+            ranged = sum(1 for r in s3.ranges if r)
+            if codec and not ranged:
+                print(f'FAIL: {key}: no resume started from a later member')
+                sys.exit(1)
+            print(f'Resume {key}: {len(points)} checkpoints OK ({ranged} ranged reads)')
+    if load_inventory.zstandard is None:
+        print('Resume .zst: skipped, zstandard is not installed')
+
+def check_deadline():
+    # A single gzip member: the skip to a late checkpoint cannot finish and must fail, not time out
+    key = 'single.csv.gz'
+    s3.objects[key] = compress(samples()['csv'], 'gzip', 1 << 30)
+    job = {'bucket': 'check', 'key': key}
+    _, points = read(job)
+    try:
+        read({'bucket': 'check', 'key': key, 'etag': job['etag'], **points[-2]}, Deadline())
+    except RuntimeError as e:
+        print(f'Deadline while skipping: {e}')
+        return
+    print('FAIL: skipping past the deadline did not raise')
+    sys.exit(1)
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+def check_memory(size, codec, baseline, max_mb):
+    key = f'synthetic.csv{SUFFIXES[codec]}'
+    s3.objects[key] = SyntheticBody(size, codec)
+    reader, _, _ = load_inventory.open_rows({'bucket': 'check', 'key': key})
+    start = time.monotonic()
+    rows = valid = 0
+    for row in reader:
+        rows += 1
+        item = load_inventory.parse_row(row)
+        if 'Store' in item and 'Item' in item:
+            valid += 1
+        if rows % 5_000_000 == 0:
+            print(f'  {rows:,} rows, peak RSS {peak_rss_mb():.1f} MB')
+    elapsed = time.monotonic() - start
+    growth = peak_rss_mb() - baseline
+
+    print(f'Parsed {key}, {size / 1024 ** 3:.2f} GB: {rows:,} rows ({valid:,} valid) in {elapsed:.1f}s '
+          f'({size / 1024 ** 2 / elapsed:.1f} MB/s)')
+    print(f'Peak RSS: {peak_rss_mb():.1f} MB (+{growth:.1f} MB while parsing, budget {max_mb:g} MB)')
+    if growth > max_mb:
+        print('FAIL: memory grew with the file size')
+        sys.exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gb', type=float, default=2.0, help='Size of the synthetic CSV (uncompressed)')
+    parser.add_argument('--max-mb', type=float, default=64, help='Allowed growth of peak RSS while parsing')
+    args = parser.parse_args()
+
+    check_resume()
+    check_deadline()
+    size = int(args.gb * 1024 ** 3)
+    baseline = peak_rss_mb()
+    for codec in [None, 'gzip', 'zstd']:
+        if codec == 'zstd' and load_inventory.zstandard is None:
+            print('Memory .zst: skipped, zstandard is not installed')
+            continue
+        check_memory(size, codec, baseline, args.max_mb)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Exportacion completa de la tabla Inventory a NDJSON (opcionalmente gzip), en S3 o en un fichero local.
+
+Hace un scan paralelo: --segments segmentos (TotalSegments), uno por hilo, y cada hilo sube sus
+propias partes de un multipart upload a medida que las llena, asi que la memoria no depende del
+tamano de la tabla. Con gzip cada parte es un miembro gzip independiente; la concatenacion es un
+.gz valido (gzip -d, zcat y load_inventory lo leen entero).
+
+    python export.py s3://my-backups-bucket/inventory/inventory.ndjson.gz --segments 16
+    python export.py inventory.ndjson
+
+No exporta a una clave que dispare una carga (p. ej. .ndjson.gz en el bucket de uploads): se volveria
+a cargar en la tabla con valores ya viejos. Para reimportar a proposito, --allow-ingest.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+PART_SIZE = 8 * 1024 * 1024  # S3 needs >= 5 MB for every part but the last
+
+def to_json(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f'{type(obj).__name__} is not JSON serializable')
+
+def ingest_triggers(s3, bucket, key):
+    # Bucket notifications whose prefix/suffix filters match the key, e.g. load_inventory on the uploads bucket
+    try:
+        config = s3.get_bucket_notification_configuration(Bucket=bucket)
+    except ClientError as e:
+        print(f"Warning: could not read the notifications of {bucket} ({e.response['Error']['Code']}); "
+              f"make sure {key} does not trigger a load")
+        return []
+    matches = []
+    for kind in ('LambdaFunctionConfigurations', 'QueueConfigurations', 'TopicConfigurations'):
+        for notification in config.get(kind, []):
+            rules = {r['Name'].lower(): r['Value'] for r in notification.get('Filter', {}).get('Key', {}).get('FilterRules', [])}
+            if key.startswith(rules.get('prefix', '')) and key.endswith(rules.get('suffix', '')):
+                matches.append(notification.get('Id', kind))
+    return matches
+
+class S3Sink:
+    # One multipart upload shared by all segments; parts may arrive in any order, numbers are handed out here
+    def __init__(self, s3, bucket, key):
+        self.s3, self.bucket, self.key = s3, bucket, key
+        self.upload_id = s3.create_multipart_upload(Bucket=bucket, Key=key, ContentType='application/x-ndjson')['UploadId']
+        self.parts = []
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def write_part(self, data):
+        with self._lock:
+            number = len(self.parts) + 1
+            self.parts.append(None)
+        etag = self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                   PartNumber=number, Body=data)['ETag']
+        with self._lock:
+            self.parts[number - 1] = {'PartNumber': number, 'ETag': etag}
+            self.bytes += len(data)
+
+    def close(self):
+        if not self.parts:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=b'')
+            return
+        self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                          MultipartUpload={'Parts': self.parts})
+
+    def abort(self):
+        self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+class FileSink:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def write_part(self, data):
+        with self._lock:
+            self.file.write(data)
+            self.bytes += len(data)
+
+    def close(self):
+        self.file.close()
+
+    abort = close
+
+class PartBuffer:
+    # Accumulates NDJSON lines of one segment into a part (a gzip member when compressing)
+    def __init__(self, compress):
+        self.compress = compress
+        self._reset()
+
+    def _reset(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if self.compress else None
+        self.chunks = []
+        self.size = 0
+        self.lines = 0
+
+    def add(self, line):
+        self.lines += 1
+        data = self.compressor.compress(line) if self.compressor else line
+        if data:
+            self.chunks.append(data)
+            self.size += len(data)
+
+    def take(self):
+        if self.compressor:
+            self.chunks.append(self.compressor.flush())
+        data = b''.join(self.chunks)
+        self._reset()
+        return data
+
+def scan_segment(client, table, segment, total, sink, compress, leftovers):
+    deserializer = TypeDeserializer()
+    buffer = PartBuffer(compress)
+    items = 0
+    pages = 0
+    params = {'TableName': table, 'Segment': segment, 'TotalSegments': total}
+    while True:
+        response = client.scan(**params)
+        pages += 1
+        for raw in response.get('Items', []):
+            item = {k: deserializer.deserialize(v) for k, v in raw.items()}
+            buffer.add(json.dumps(item, default=to_json, ensure_ascii=False).encode('utf-8') + b'\n')
+            items += 1
+            if buffer.size >= PART_SIZE:
+                sink.write_part(buffer.take())
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    # The tail of each segment is too small to be a part on its own; they are merged at the end
+    if buffer.lines:
+        leftovers.append(buffer.take())
+    return items, pages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('destination', help='s3://bucket/key or a local path; a .gz suffix compresses')
+    parser.add_argument('--table', default=os.environ.get('TABLE_NAME', 'Inventory'))
+    parser.add_argument('--segments', type=int, default=8, help='TotalSegments of the parallel scan (one thread each)')
+    parser.add_argument('--allow-ingest', action='store_true',
+                        help='write even if the key triggers a load (deliberate re-import of the export)')
+    args = parser.parse_args()
+
+    compress = args.destination.endswith('.gz')
+    config = Config(max_pool_connections=max(10, args.segments * 2), retries={'mode': 'adaptive', 'max_attempts': 10})
+    dynamodb = boto3.client('dynamodb', config=config)
+    if args.destination.startswith('s3://'):
+        bucket, _, key = args.destination[5:].partition('/')
+        s3 = boto3.client('s3', config=config)
+        triggers = ingest_triggers(s3, bucket, key)
+        if triggers and not args.allow_ingest:
+            parser.error(f"s3://{bucket}/{key} would be loaded back into the table ({', '.join(triggers)}); "
+                         f"use another bucket or suffix, or --allow-ingest to re-import it on purpose")
+        sink = S3Sink(s3, bucket, key)
+    else:
+        sink = FileSink(args.destination)
+
+    start = time.monotonic()
+    leftovers = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.segments) as pool:
+            futures = [pool.submit(scan_segment, dynamodb, args.table, segment, args.segments, sink, compress, leftovers)
+                       for segment in range(args.segments)]
+            results = [f.result() for f in futures]
+        if not leftovers and not sink.bytes and compress:
+            leftovers.append(PartBuffer(True).take())  # empty table: still a valid .gz
+        if leftovers:
+            sink.write_part(b''.join(leftovers))
+        sink.close()
+    except BaseException:
+        sink.abort()
+        raise
+    elapsed = time.monotonic() - start
+
+    items = sum(r[0] for r in results)
+    pages = sum(r[1] for r in results)
+    print(f'Exported {items:,} items ({pages} scan pages, {args.segments} segments) to {args.destination}: '
+          f'{sink.bytes / 1024 ** 2:.1f} MB in {elapsed:.1f}s ({items / max(elapsed, 1e-9):,.0f} items/s)')
+    for segment, (seg_items, seg_pages) in enumerate(results):
+        print(f'  segment {segment}: {seg_items:,} items, {seg_pages} pages')
+
+if __name__ == '__main__':
+    main()
@@ -36,11 +36,19 @@ except Exception:
 BUCKET_UPLOADS = f"inventory-uploads-{SUFFIX}"
 BUCKET_WEB = f"inventory-web-{SUFFIX}"
 TABLE_NAME = "Inventory"
+META_TABLE_NAME = "InventoryMeta"  # cache version bumped from the stream
+LOW_STOCK_INDEX = "LowStockIndex"  # sparse GSI: only items with LowStockStore (Count <= threshold)
+LOW_STOCK_THRESHOLD = '0'
+SUMMARY_TABLE_NAME = "InventoryStores"  # per-store aggregates maintained from the stream
 TOPIC_NAME = "NoStock"
 LAMBDA_LOAD_NAME = "load_inventory"
 LAMBDA_GET_NAME = "get_inventory_api"
 LAMBDA_NOTIFY_NAME = "notify_low_stock"
+LAMBDA_AGGREGATE_NAME = "aggregate_stores"
 API_NAME = "InventoryAPI"
+# Upload suffixes that trigger load_inventory (S3 rejects overlapping filters, so no bare '.gz')
+INPUT_SUFFIXES = ['.csv', '.csv.gz', '.csv.zst', '.ndjson', '.ndjson.gz', '.ndjson.zst',
+                  '.jsonl', '.jsonl.gz', '.jsonl.zst', '.parquet']
 
 # Clients
 s3 = boto3.client('s3')
@@ -65,6 +73,15 @@ def create_bucket(bucket_name):
     except Exception as e:
         logger.error(f"Error creating bucket {bucket_name}: {e}")
 
+LOW_STOCK_GSI = {
+    'IndexName': LOW_STOCK_INDEX,
+    'KeySchema': [
+        {'AttributeName': 'LowStockStore', 'KeyType': 'HASH'},
+        {'AttributeName': 'Item', 'KeyType': 'RANGE'}
+    ],
+    'Projection': {'ProjectionType': 'ALL'}
+}
+
 def create_dynamodb_table():
     logger.info(f"Creating DynamoDB table {TABLE_NAME}...")
     try:
@@ -76,8 +93,10 @@ def create_dynamodb_table():
             ],
             AttributeDefinitions=[
                 {'AttributeName': 'Store', 'AttributeType': 'S'},
-                {'AttributeName': 'Item', 'AttributeType': 'S'}
+                {'AttributeName': 'Item', 'AttributeType': 'S'},
+                {'AttributeName': 'LowStockStore', 'AttributeType': 'S'}
             ],
+            GlobalSecondaryIndexes=[LOW_STOCK_GSI],
             BillingMode='PAY_PER_REQUEST',
             StreamSpecification={
                 'StreamEnabled': True,
@@ -103,6 +122,65 @@ def create_dynamodb_table():
                 logger.info(f"Enabled streams for {TABLE_NAME}")
         except Exception as e:
             logger.error(f"Error checking/updating table stream: {e}")
+        # Tables created before the low-stock index get it added. It starts empty: items loaded
+        # earlier have no LowStockStore and only enter the index when their file is uploaded again.
+        try:
+            # The stream update above leaves the table UPDATING; update_table needs it ACTIVE
+            dynamodb.get_waiter('table_exists').wait(TableName=TABLE_NAME)
+            desc = dynamodb.describe_table(TableName=TABLE_NAME)
+            indexes = [i['IndexName'] for i in desc['Table'].get('GlobalSecondaryIndexes', [])]
+            if LOW_STOCK_INDEX not in indexes:
+                dynamodb.update_table(
+                    TableName=TABLE_NAME,
+                    AttributeDefinitions=[
+                        {'AttributeName': 'Item', 'AttributeType': 'S'},
+                        {'AttributeName': 'LowStockStore', 'AttributeType': 'S'}
+                    ],
+                    GlobalSecondaryIndexUpdates=[{'Create': LOW_STOCK_GSI}]
+                )
+                logger.info(f"Creating index {LOW_STOCK_INDEX} on {TABLE_NAME}")
+        except Exception as e:
+            logger.error(f"Error checking/creating low-stock index: {e}")
+
+def create_key_table(table_name, key_name):
+    # Small auxiliary tables with a single string hash key
+    logger.info(f"Creating DynamoDB table {table_name}...")
+    try:
+        dynamodb.create_table(
+            TableName=table_name,
+            KeySchema=[{'AttributeName': key_name, 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': key_name, 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        waiter = dynamodb.get_waiter('table_exists')
+        waiter.wait(TableName=table_name)
+        logger.info(f"Table {table_name} created.")
+    except dynamodb.exceptions.ResourceInUseException:
+        logger.info(f"Table {table_name} already exists.")
+
+def enable_ttl(table_name, attribute):
+    ttl = dynamodb.describe_time_to_live(TableName=table_name)['TimeToLiveDescription']
+    if ttl.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+        return
+    logger.info(f"Enabling TTL on {table_name}.{attribute}...")
+    dynamodb.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={'Enabled': True, 'AttributeName': attribute}
+    )
+
+def create_stream_mapping(function_name, stream_arn):
+    # Check if mapping exists
+    mappings = lambda_client.list_event_source_mappings(FunctionName=function_name)
+    for m in mappings['EventSourceMappings']:
+        if m['EventSourceArn'] == stream_arn:
+            return
+
+    lambda_client.create_event_source_mapping(
+        EventSourceArn=stream_arn,
+        FunctionName=function_name,
+        StartingPosition='LATEST',
+        BatchSize=10
+    )
 
 def create_sns_topic():
     logger.info(f"Creating SNS topic {TOPIC_NAME}...")
@@ -147,7 +225,7 @@ def zip_lambda(function_name):
         z.write(source_file, 'lambda_function.py')
     return zip_path
 
-def create_lambda(function_name, role_arn, handler, zip_path, env_vars={}):
+def create_lambda(function_name, role_arn, handler, zip_path, env_vars={}, timeout=30):
     logger.info(f"Creating Lambda {function_name}...")
     if not zip_path: return None
 
@@ -161,7 +239,7 @@ def create_lambda(function_name, role_arn, handler, zip_path, env_vars={}):
             Role=role_arn,
             Handler=handler,
             Code={'ZipFile': zipped_code},
-            Timeout=30,
+            Timeout=timeout,
             Environment={'Variables': env_vars}
         )
     except lambda_client.exceptions.ResourceConflictException:
@@ -172,6 +250,7 @@ def create_lambda(function_name, role_arn, handler, zip_path, env_vars={}):
         )
         lambda_client.update_function_configuration(
             FunctionName=function_name,
+            Timeout=timeout,
             Environment={'Variables': env_vars}
         )
     
@@ -180,23 +259,27 @@ def create_lambda(function_name, role_arn, handler, zip_path, env_vars={}):
 def create_api_gateway(lambda_arn):
     logger.info("Creating API Gateway...")
     
+    # HTTP APIs answer CORS themselves: the pagination header must be exposed here for the web to read it
+    cors = {
+        'AllowOrigins': ['*'],
+        'AllowMethods': ['GET', 'OPTIONS'],
+        'AllowHeaders': ['*'],
+        'ExposeHeaders': ['X-Next-Token']
+    }
     apis = apigateway.get_apis()
     api_id = None
     for item in apis.get('Items', []):
         if item['Name'] == API_NAME:
             api_id = item['ApiId']
             logger.info(f"API {API_NAME} already exists with ID {api_id}")
+            apigateway.update_api(ApiId=api_id, CorsConfiguration=cors)
             break
     
     if not api_id:
         api = apigateway.create_api(
             Name=API_NAME,
             ProtocolType='HTTP',
-            CorsConfiguration={
-                'AllowOrigins': ['*'],
-                'AllowMethods': ['GET', 'OPTIONS'],
-                'AllowHeaders': ['*']
-            }
+            CorsConfiguration=cors
         )
         api_id = api['ApiId']
     
@@ -220,7 +303,7 @@ def create_api_gateway(lambda_arn):
         integration_id = integration['IntegrationId']
 
     # Routes
-    for route_key in ['GET /items', 'GET /items/{store}']:
+    for route_key in ['GET /items', 'GET /items/{store}', 'GET /stores', 'GET /stores/{store}/summary']:
         try:
             apigateway.create_route(
                 ApiId=api_id,
@@ -261,6 +344,9 @@ def main():
 
     # 2. Create DynamoDB
     create_dynamodb_table()
+    create_key_table(META_TABLE_NAME, 'Name')
+    enable_ttl(META_TABLE_NAME, 'ExpiresAt')  # markers of applied batches from aggregate_stores
+    create_key_table(SUMMARY_TABLE_NAME, 'Store')
     
     # 3. Create SNS
     topic_arn = create_sns_topic()
@@ -277,6 +363,7 @@ def main():
     load_role_arn = lab_role_arn
     get_role_arn = lab_role_arn
     notify_role_arn = lab_role_arn
+    aggregate_role_arn = lab_role_arn
     
     logger.info(f"Using role: {lab_role_arn}")
 
@@ -284,10 +371,21 @@ def main():
     load_zip = zip_lambda(LAMBDA_LOAD_NAME)
     get_zip = zip_lambda(LAMBDA_GET_NAME)
     notify_zip = zip_lambda(LAMBDA_NOTIFY_NAME)
-
-    create_lambda(LAMBDA_LOAD_NAME, load_role_arn, 'lambda_function.lambda_handler', load_zip, {'TABLE_NAME': TABLE_NAME})
-    create_lambda(LAMBDA_GET_NAME, get_role_arn, 'lambda_function.lambda_handler', get_zip, {'TABLE_NAME': TABLE_NAME})
-    create_lambda(LAMBDA_NOTIFY_NAME, notify_role_arn, 'lambda_function.lambda_handler', notify_zip, {'TOPIC_ARN': topic_arn})
+    aggregate_zip = zip_lambda(LAMBDA_AGGREGATE_NAME)
+
+    create_lambda(LAMBDA_LOAD_NAME, load_role_arn, 'lambda_function.lambda_handler', load_zip,
+                  {'TABLE_NAME': TABLE_NAME, 'WRITE_CONCURRENCY': '8', 'SKIP_UNCHANGED': '1',
+                   'LOW_STOCK_THRESHOLD': LOW_STOCK_THRESHOLD,
+                   'CHECKPOINT_MARGIN_MS': '30000'},
+                  timeout=300)  # large files continue in chained invocations from a checkpoint
+    create_lambda(LAMBDA_GET_NAME, get_role_arn, 'lambda_function.lambda_handler', get_zip,
+                  {'TABLE_NAME': TABLE_NAME, 'META_TABLE': META_TABLE_NAME, 'CACHE_TTL': '30',
+                   'SUMMARY_TABLE': SUMMARY_TABLE_NAME, 'LOW_STOCK_INDEX': LOW_STOCK_INDEX})
+    create_lambda(LAMBDA_NOTIFY_NAME, notify_role_arn, 'lambda_function.lambda_handler', notify_zip,
+                  {'TOPIC_ARN': topic_arn, 'META_TABLE': META_TABLE_NAME})
+    create_lambda(LAMBDA_AGGREGATE_NAME, aggregate_role_arn, 'lambda_function.lambda_handler', aggregate_zip,
+                  {'TABLE_NAME': TABLE_NAME, 'SUMMARY_TABLE': SUMMARY_TABLE_NAME, 'META_TABLE': META_TABLE_NAME},
+                  timeout=300)
 
     # 6. S3 Trigger for Load Lambda
     logger.info("Configuring S3 notification...")
@@ -306,34 +404,21 @@ def main():
         Bucket=BUCKET_UPLOADS,
         NotificationConfiguration={
             'LambdaFunctionConfigurations': [{
+                'Id': f"load-inventory{suffix.replace('.', '-')}",
                 'LambdaFunctionArn': f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{LAMBDA_LOAD_NAME}",
                 'Events': ['s3:ObjectCreated:*'],
-                'Filter': {'Key': {'FilterRules': [{'Name': 'suffix', 'Value': '.csv'}]}}
-            }]
+                'Filter': {'Key': {'FilterRules': [{'Name': 'suffix', 'Value': suffix}]}}
+            } for suffix in INPUT_SUFFIXES]
         }
     )
     
-    # 7. DynamoDB Stream Trigger for Notify Lambda
-    logger.info("Configuring DynamoDB Stream trigger...")
+    # 7. DynamoDB Stream Triggers for Notify and Aggregate Lambdas (a stream allows two readers per shard)
+    logger.info("Configuring DynamoDB Stream triggers...")
     try:
         table_desc = dynamodb.describe_table(TableName=TABLE_NAME)
         stream_arn = table_desc['Table']['LatestStreamArn']
-        
-        # Check if mapping exists
-        mappings = lambda_client.list_event_source_mappings(FunctionName=LAMBDA_NOTIFY_NAME)
-        mapping_exists = False
-        for m in mappings['EventSourceMappings']:
-            if m['EventSourceArn'] == stream_arn:
-                mapping_exists = True
-                break
-        
-        if not mapping_exists:
-            lambda_client.create_event_source_mapping(
-                EventSourceArn=stream_arn,
-                FunctionName=LAMBDA_NOTIFY_NAME,
-                StartingPosition='LATEST',
-                BatchSize=10
-            )
+        create_stream_mapping(LAMBDA_NOTIFY_NAME, stream_arn)
+        create_stream_mapping(LAMBDA_AGGREGATE_NAME, stream_arn)
     except Exception as e:
         logger.error(f"Error configuring DynamoDB stream trigger: {e}")
 
@@ -406,10 +491,13 @@ def main():
         'BUCKET_UPLOADS': BUCKET_UPLOADS,
         'BUCKET_WEB': BUCKET_WEB,
         'TABLE_NAME': TABLE_NAME,
+        'META_TABLE_NAME': META_TABLE_NAME,
+        'SUMMARY_TABLE_NAME': SUMMARY_TABLE_NAME,
         'TOPIC_ARN': topic_arn,
         'LAMBDA_LOAD_NAME': LAMBDA_LOAD_NAME,
         'LAMBDA_GET_NAME': LAMBDA_GET_NAME,
         'LAMBDA_NOTIFY_NAME': LAMBDA_NOTIFY_NAME,
+        'LAMBDA_AGGREGATE_NAME': LAMBDA_AGGREGATE_NAME,
         'API_NAME': API_NAME,
         'ROLES': ['LambdaLoadInventoryRole', 'LambdaGetInventoryRole', 'LambdaNotifyLowStockRole']
     })
@@ -93,9 +93,12 @@ def main():
     if 'BUCKET_UPLOADS' in state: delete_bucket(state['BUCKET_UPLOADS'])
     if 'BUCKET_WEB' in state: delete_bucket(state['BUCKET_WEB'])
     if 'TABLE_NAME' in state: delete_table(state['TABLE_NAME'])
+    if 'META_TABLE_NAME' in state: delete_table(state['META_TABLE_NAME'])
+    if 'SUMMARY_TABLE_NAME' in state: delete_table(state['SUMMARY_TABLE_NAME'])
     if 'LAMBDA_LOAD_NAME' in state: delete_lambda(state['LAMBDA_LOAD_NAME'])
     if 'LAMBDA_GET_NAME' in state: delete_lambda(state['LAMBDA_GET_NAME'])
     if 'LAMBDA_NOTIFY_NAME' in state: delete_lambda(state['LAMBDA_NOTIFY_NAME'])
+    if 'LAMBDA_AGGREGATE_NAME' in state: delete_lambda(state['LAMBDA_AGGREGATE_NAME'])
     if 'API_NAME' in state: delete_api(state['API_NAME'])
     if 'TOPIC_ARN' in state: delete_sns_topic(state['TOPIC_ARN'])
 
@@ -0,0 +1,103 @@
+import json
+import boto3
+import os
+import time
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource('dynamodb')
+TABLE_NAME = os.environ.get('TABLE_NAME', 'Inventory')
+SUMMARY_TABLE = os.environ.get('SUMMARY_TABLE', 'InventoryStores')
+META_TABLE = os.environ.get('META_TABLE', 'InventoryMeta')
+APPLIED_TTL = int(os.environ.get('APPLIED_TTL', '86400'))  # stream records are kept 24 h
+summary_table = dynamodb.Table(SUMMARY_TABLE)
+
+def _count(image):
+    try:
+        return int(image['Count']['N'])
+    except (KeyError, TypeError, ValueError):
+        return 0
+
+def store_deltas(records):
+    # Net change per store in this batch: items, units and zero-stock items, plus the first record's eventID
+    deltas = {}
+    for record in records:
+        old = record['dynamodb'].get('OldImage')
+        new = record['dynamodb'].get('NewImage')
+        image = new or old
+        if not image or 'Store' not in image:
+            continue
+        store = image['Store']['S']
+        d = deltas.setdefault(store, {'items': 0, 'units': 0, 'zero': 0, 'first': record['eventID']})
+        d['items'] += (1 if new else 0) - (1 if old else 0)
+        d['units'] += _count(new) - _count(old)
+        d['zero'] += (1 if new and _count(new) == 0 else 0) - (1 if old and _count(old) == 0 else 0)
+    return deltas
+
+def apply_delta(store, d):
+    # One transaction per store: the ADD on the summary plus a marker keyed by the store and the
+    # batch's first eventID. A retried batch finds its marker and is a no-op, whatever the order in
+    # which shards deliver the store's records (a store's items can live on several shards).
+    now = int(time.time())
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': META_TABLE,
+                'Item': {'Name': f"stores#{store}#{d['first']}", 'ExpiresAt': now + APPLIED_TTL},
+                'ConditionExpression': 'attribute_not_exists(#name)',
+                'ExpressionAttributeNames': {'#name': 'Name'}
+            }},
+            {'Update': {
+                'TableName': SUMMARY_TABLE,
+                'Key': {'Store': store},
+                'UpdateExpression': 'ADD #items :items, Units :units, ZeroStock :zero SET UpdatedAt = :now',
+                'ExpressionAttributeNames': {'#items': 'Items'},
+                'ExpressionAttributeValues': {
+                    ':items': d['items'], ':units': d['units'], ':zero': d['zero'], ':now': now
+                }
+            }}
+        ])
+        return True
+    except ClientError as e:
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if e.response['Error']['Code'] != 'TransactionCanceledException' or reasons[0].get('Code') != 'ConditionalCheckFailed':
+            raise
+        print(f"Skipping {store}: batch starting at {d['first']} was already applied")
+        return False
+
+def rebuild():
+    # Recomputes every summary from the Inventory table (for data loaded before this consumer existed).
+    # Run it while no uploads are being processed.
+    table = dynamodb.Table(TABLE_NAME)
+    totals = {}
+    params = {'ProjectionExpression': 'Store, #c', 'ExpressionAttributeNames': {'#c': 'Count'}}
+    while True:
+        response = table.scan(**params)
+        for item in response.get('Items', []):
+            t = totals.setdefault(item['Store'], {'Items': 0, 'Units': 0, 'ZeroStock': 0})
+            count = int(item.get('Count', 0))
+            t['Items'] += 1
+            t['Units'] += count
+            t['ZeroStock'] += 1 if count == 0 else 0
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    with summary_table.batch_writer() as batch:
+        for store, t in totals.items():
+            batch.put_item(Item={'Store': store, **t, 'UpdatedAt': int(time.time())})
+    print(f"Rebuilt {len(totals)} store summaries")
+    return len(totals)
+
+def lambda_handler(event, context):
+    print("Received event:", json.dumps(event))
+
+    if event.get('rebuild'):
+        return {'statusCode': 200, 'body': json.dumps(f'Rebuilt {rebuild()} store summaries')}
+
+    deltas = store_deltas(event.get('Records', []))
+    applied = sum(apply_delta(store, d) for store, d in deltas.items())
+    print(f"Updated {applied} of {len(deltas)} store summaries from {len(event.get('Records', []))} records")
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Processed DynamoDB Stream')
+    }
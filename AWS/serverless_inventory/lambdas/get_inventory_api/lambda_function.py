@@ -1,60 +1,232 @@
+import base64
+import hashlib
 import json
 import boto3
 import os
+import time
 import urllib.parse
+from collections import OrderedDict
 from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = os.environ.get('TABLE_NAME', 'Inventory')
 table = dynamodb.Table(TABLE_NAME)
 
+# Page size when ?limit is missing, and its upper bound (keeps responses far below the 6 MB Lambda limit)
+DEFAULT_LIMIT = int(os.environ.get('DEFAULT_LIMIT', '100'))
+MAX_LIMIT = int(os.environ.get('MAX_LIMIT', '1000'))
+# The body stays a plain array; the token for the next page travels in this header (absent on the last page)
+NEXT_HEADER = 'X-Next-Token'
+
+# Per-container response cache: survives between warm invocations, bounded by age, entries and bytes
+CACHE_TTL = float(os.environ.get('CACHE_TTL', '30'))  # seconds, 0 disables it
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# no-cache: browsers keep the copy but revalidate it with If-None-Match (answered with a 304)
+CACHE_CONTROL = os.environ.get('CACHE_CONTROL', 'no-cache')
+# Optional: table where notify_low_stock bumps a version on every stream batch that changes inventory
+META_TABLE = os.environ.get('META_TABLE')
+VERSION_CHECK_SECONDS = float(os.environ.get('VERSION_CHECK_SECONDS', '1'))
+meta_table = dynamodb.Table(META_TABLE) if META_TABLE else None
+# Sparse GSI: only items at or below load_inventory's LOW_STOCK_THRESHOLD carry LowStockStore (= Store)
+LOW_STOCK_INDEX = os.environ.get('LOW_STOCK_INDEX', 'LowStockIndex')
+# Per-store summaries maintained by aggregate_stores from the table stream
+SUMMARY_TABLE = os.environ.get('SUMMARY_TABLE', 'InventoryStores')
+summary_table = dynamodb.Table(SUMMARY_TABLE)
+
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
             return int(obj)
         return super(DecimalEncoder, self).default(obj)
 
-def _resp(code, body):
+def _resp(code, body, headers=None):
     return {
         "statusCode": code,
         "headers": {
             "Content-Type": "application/json",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, OPTIONS",
-            "Access-Control-Allow-Headers": "*"
+            "Access-Control-Allow-Headers": "*",
+            "Access-Control-Expose-Headers": NEXT_HEADER,
+            **(headers or {})
         },
-        "body": json.dumps(body, cls=DecimalEncoder)
+        "body": body if isinstance(body, str) else json.dumps(body, cls=DecimalEncoder)  # str: already encoded
     }
 
+class ResponseCache:
+    # LRU of encoded pages; Lambda runs one request at a time per container, so no locking
+    def __init__(self, ttl, max_entries, max_bytes):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.version = None
+        self.version_checked = 0.0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry['expires'] <= time.monotonic():
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        size = len(entry['body'])
+        if self.ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        entry['expires'] = time.monotonic() + self.ttl
+        self.entries[key] = entry
+        self.bytes += size
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def _drop(self, key):
+        self.bytes -= len(self.entries.pop(key)['body'])
+
+    def check_version(self):
+        # Throttled read of the stream-driven version; a change empties the cache
+        if meta_table is None or time.monotonic() - self.version_checked < VERSION_CHECK_SECONDS:
+            return
+        self.version_checked = time.monotonic()
+        try:
+            version = (meta_table.get_item(Key={'Name': 'cache'}).get('Item') or {}).get('Version', 0)
+        except Exception as e:
+            print(f"Version check failed, relying on the TTL: {e}")
+            return
+        if version != self.version:
+            if self.version is not None:
+                print(f"Inventory changed (version {self.version} -> {version}), dropping {len(self.entries)} cached pages")
+            self.clear()
+            self.version = version
+
+cache = ResponseCache(CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+def not_modified(headers, etag):
+    # HTTP API v2 lower-cases header names
+    value = (headers or {}).get('if-none-match', '')
+    return value.strip() == '*' or etag in [tag.strip() for tag in value.split(',')]
+
+def encode_token(last_key):
+    # Opaque to clients: url-safe base64 of the LastEvaluatedKey (Store + Item)
+    raw = json.dumps(last_key, cls=DecimalEncoder, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_token(token):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        key = None
+    # Table keys, plus the index key for pages of the low-stock index
+    if (not isinstance(key, dict) or set(key) not in ({'Store', 'Item'}, {'Store', 'Item', 'LowStockStore'})
+            or not all(isinstance(v, str) for v in key.values())):
+        raise ValueError("invalid 'next' token")
+    return key
+
+def page_params(query, store=None, low_stock=False):
+    try:
+        limit = int(query.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("'limit' must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}")
+    params = {'Limit': limit}
+    if query.get('next'):
+        start_key = decode_token(query['next'])
+        if store is not None and start_key['Store'] != store:
+            raise ValueError("'next' token belongs to another store")
+        if low_stock != ('LowStockStore' in start_key):
+            raise ValueError("'next' token belongs to another listing")
+        params['ExclusiveStartKey'] = start_key
+    return params
+
+def store_summaries(store=None):
+    if store:
+        item = summary_table.get_item(Key={'Store': store}).get('Item')
+        return _resp(200, item) if item else _resp(404, {"error": f"unknown store {store}"})
+    # One item per store: small enough to return whole
+    response = summary_table.scan()
+    items = response.get('Items', [])
+    while 'LastEvaluatedKey' in response:
+        response = summary_table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
+        items.extend(response.get('Items', []))
+    return _resp(200, sorted((i for i in items if i.get('Items', 0) > 0), key=lambda i: i['Store']))
+
 def lambda_handler(event, context):
     print("Event:", json.dumps(event))
     
     try:
         # API Gateway HTTP API payload format v2.0
         path_parameters = event.get('pathParameters') or {}
+        query = event.get('queryStringParameters') or {}
         store = path_parameters.get('store')
-        
-        items = []
-        
         if store:
-            # Query by Store (Partition Key)
             store = urllib.parse.unquote(store)
-            response = table.query(
-                KeyConditionExpression=Key('Store').eq(store)
-            )
-            items = response.get('Items', [])
-        else:
-            # Scan all
-            response = table.scan()
-            items = response.get('Items', [])
-            
-            # Handle pagination if needed
-            while 'LastEvaluatedKey' in response:
-                response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-                items.extend(response.get('Items', []))
-
-        return _resp(200, items)
+
+        if event.get('routeKey') in ('GET /stores', 'GET /stores/{store}/summary'):
+            return store_summaries(store)
+
+        low_stock = query.get('low_stock', '').lower() in ('true', '1')
+        try:
+            params = page_params(query, store, low_stock)
+        except ValueError as e:
+            return _resp(400, {"error": str(e)})
+        
+        cache.check_version()
+        cache_key = (store or '', low_stock, params['Limit'], query.get('next') or '')
+        entry = cache.get(cache_key)
+        hit = entry is not None
+        if not hit:
+            try:
+                if low_stock and store:
+                    # Only this store's low-stock items are in its index partition
+                    response = table.query(
+                        IndexName=LOW_STOCK_INDEX,
+                        KeyConditionExpression=Key('LowStockStore').eq(store),
+                        **params
+                    )
+                elif low_stock:
+                    # The index is sparse: scanning it reads the low-stock items only, not the table
+                    response = table.scan(IndexName=LOW_STOCK_INDEX, **params)
+                elif store:
+                    # Query by Store (Partition Key)
+                    response = table.query(
+                        KeyConditionExpression=Key('Store').eq(store),
+                        **params
+                    )
+                else:
+                    # One page of the scan; the client follows the token for the rest
+                    response = table.scan(**params)
+            except ClientError as e:
+                # An index added to an existing table cannot be read until it is ACTIVE
+                error = e.response['Error']
+                if low_stock and error['Code'] == 'ValidationException' and LOW_STOCK_INDEX in error.get('Message', ''):
+                    return _resp(503, {"error": "low-stock index is not ready yet"}, {'Retry-After': '60'})
+                raise
+            body = json.dumps(response.get('Items', []), cls=DecimalEncoder)
+            next_token = encode_token(response['LastEvaluatedKey']) if 'LastEvaluatedKey' in response else None
+            digest = hashlib.sha256(f"{body}\n{next_token or ''}".encode('utf-8')).hexdigest()[:32]
+            entry = {'body': body, 'next': next_token, 'etag': f'"{digest}"'}
+            cache.put(cache_key, entry)
+
+        headers = {'ETag': entry['etag'], 'Cache-Control': CACHE_CONTROL, 'X-Cache': 'HIT' if hit else 'MISS'}
+        if entry['next']:
+            headers[NEXT_HEADER] = entry['next']
+        if not_modified(event.get('headers'), entry['etag']):
+            return _resp(304, '', headers)
+        return _resp(200, entry['body'], headers)
 
     except Exception as e:
         print(e)
@@ -1,51 +1,451 @@
 import json
 import urllib.parse
 import boto3
+import codecs
 import csv
-import io
 import os
+import queue
+import random
+import threading
+import time
+import zlib
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+# Optional: zstd needs the zstandard package and Parquet needs pyarrow (e.g. from a Lambda layer)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
-s3 = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = os.environ.get('TABLE_NAME', 'Inventory')
+READ_CHUNK_SIZE = int(os.environ.get('READ_CHUNK_SIZE', str(1024 * 1024)))
+# Parallel BatchWriteItem calls in flight (one writer thread each)
+WRITE_CONCURRENCY = int(os.environ.get('WRITE_CONCURRENCY', '8'))
+WRITE_MAX_RETRIES = int(os.environ.get('WRITE_MAX_RETRIES', '10'))  # per batch, for UnprocessedItems
+PROGRESS_EVERY = int(os.environ.get('PROGRESS_EVERY', '100000'))  # rows between progress logs
+# Read each batch back first and only write the items that changed (no WCU, no stream record otherwise)
+SKIP_UNCHANGED = os.environ.get('SKIP_UNCHANGED', '1') == '1'
+# Items at or below this Count get LowStockStore (= Store), which puts them in the sparse LowStockIndex.
+# Full puts drop the attribute again when the stock goes back up.
+LOW_STOCK_THRESHOLD = int(os.environ.get('LOW_STOCK_THRESHOLD', '0'))
+ZSTD_FEED_SIZE = 64 * 1024  # compressed bytes per zstd decompress() call
+PARQUET_BATCH_ROWS = int(os.environ.get('PARQUET_BATCH_ROWS', '10000'))
+# Time left when the loader stops, flushes the writers and hands the rest of the file to a new invocation
+CHECKPOINT_MARGIN_MS = int(os.environ.get('CHECKPOINT_MARGIN_MS', '30000'))
+
+s3 = boto3.client('s3')
+lambda_client = boto3.client('lambda')
+# One HTTP connection per writer thread; throttling errors are retried by botocore itself
+dynamodb = boto3.resource('dynamodb', config=Config(
+    max_pool_connections=max(10, WRITE_CONCURRENCY),
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+))
 table = dynamodb.Table(TABLE_NAME)
+BATCH_SIZE = 25  # BatchWriteItem limit
+
+def iter_lines(chunks, encoding='utf-8-sig', position=None, skip_to=0):
+    # Splits the byte stream into text lines as it arrives: only one chunk plus a partial line is in
+    # memory. '\n' never occurs inside a UTF-8 multi-byte sequence, so lines are cut on bytes and each
+    # one goes through the incremental decoder (which also drops a leading BOM).
+    # position['offset'] counts the raw bytes handed out so far; csv pulls lines one record at a time,
+    # so right after a row is yielded it is the byte offset where the next record starts.
+    # Lines ending at or before skip_to are dropped undecoded (they may start mid-character).
+    decoder = codecs.getincrementaldecoder(encoding)()
+    if position is None:
+        position = {}
+    position.setdefault('offset', 0)
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            position['offset'] += len(line) + 1
+            if position['offset'] > skip_to:
+                yield decoder.decode(line + b'\n')
+    if pending:
+        position['offset'] += len(pending)
+        if position['offset'] > skip_to:
+            yield decoder.decode(pending, final=True)
+
+def input_format(key):
+    # 'feed.csv.gz' -> ('csv', 'gzip'), 'feed.parquet' -> ('parquet', None); unknown suffixes are read as CSV
+    name = key.lower()
+    compression = None
+    for suffix, codec in (('.gz', 'gzip'), ('.zst', 'zstd')):
+        if name.endswith(suffix):
+            name, compression = name[:-len(suffix)], codec
+            break
+    for suffix, fmt in (('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.parquet', 'parquet')):
+        if name.endswith(suffix):
+            return fmt, compression
+    return 'csv', compression
+
+def _member_started(position, compressed, decompressed):
+    # Remembers where a gzip member / zstd frame starts, in the object and in the decompressed stream.
+    # Only the last start at or before the current line offset can be needed for a checkpoint.
+    members = position['members']
+    members.append((compressed, decompressed))
+    while len(members) > 1 and members[1][1] <= position['offset']:
+        del members[0]
+
+def member_at(position, offset):
+    # Start of the member that contains the decompressed offset: a resume reads the object from there
+    return max((m for m in position['members'] if m[1] <= offset), key=lambda m: m[1])
+
+def gunzip_chunks(chunks, position):
+    # Inflates at most READ_CHUNK_SIZE bytes at a time, also across concatenated gzip members.
+    # position['members'][-1] is where the read starts (compressed, decompressed offsets).
+    compressed, decompressed = position['members'][-1]
+    decompressor = zlib.decompressobj(wbits=31)
+    for chunk in chunks:
+        while chunk:
+            if decompressor.eof:
+                decompressor = zlib.decompressobj(wbits=31)
+                _member_started(position, compressed, decompressed)
+            data = decompressor.decompress(chunk, READ_CHUNK_SIZE)
+            rest = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+            compressed += len(chunk) - len(rest)
+            decompressed += len(data)
+            chunk = rest
+            yield data
+    yield decompressor.flush()
+
+def unzstd_chunks(chunks, position):
+    # Same for zstd frames. Input is fed in small slices because decompress() has no output limit.
+    compressed, decompressed = position['members'][-1]
+    decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        for i in range(0, len(chunk), ZSTD_FEED_SIZE):
+            piece = chunk[i:i + ZSTD_FEED_SIZE]
+            while piece:
+                if decompressor.eof:
+                    decompressor = zstandard.ZstdDecompressor().decompressobj()
+                    _member_started(position, compressed, decompressed)
+                data = decompressor.decompress(piece)
+                rest = decompressor.unused_data if decompressor.eof else b''
+                compressed += len(piece) - len(rest)
+                decompressed += len(data)
+                piece = rest
+                yield data
+
+def watch_skip(chunks, position, skip_to, context, key):
+    # While decompressing up to the checkpoint no row comes out, so the row loop cannot stop in time.
+    # A skip that runs into the deadline would time out every retry: fail loudly instead.
+    for chunk in chunks:
+        if (position['offset'] < skip_to and context
+                and context.get_remaining_time_in_millis() < CHECKPOINT_MARGIN_MS):
+            raise RuntimeError(f"{key}: checkpoint at decompressed byte {skip_to} is unreachable, only "
+                               f"{position['offset']} bytes skipped before the deadline. Upload the file "
+                               f"split into several gzip members / zstd frames (or uncompressed).")
+        yield chunk
+
+def ndjson_rows(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Anything that is not an object is reported as an invalid row
+        yield row if isinstance(row, dict) else {'line': line.rstrip()}
+
+def parquet_rows(bucket, key, position, offset):
+    # pyarrow reads the footer and then one row group at a time with ranged GETs;
+    # row groups before the checkpoint row are skipped without being downloaded
+    source = pafs.S3FileSystem(region=os.environ.get('AWS_REGION')).open_input_file(f"{bucket}/{key}")
+    parquet_file = pq.ParquetFile(source)
+    groups = []
+    first = 0
+    for i in range(parquet_file.num_row_groups):
+        rows = parquet_file.metadata.row_group(i).num_rows
+        if not groups and first + rows <= offset:
+            first += rows
+        else:
+            groups.append(i)
+    position['offset'] = first
+    try:
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_ROWS, row_groups=groups):
+            for row in batch.to_pylist():
+                position['offset'] += 1
+                if position['offset'] > offset:
+                    yield row
+    finally:
+        source.close()
+
+def open_rows(job, context=None):
+    # Returns (rows, position, body). position['offset'] is where the checkpoint resumes: the byte offset
+    # in the object for plain text, in the decompressed stream for gzip/zstd, and the row number for Parquet.
+    # Compressed input resumes at job['member'], the start of the gzip member / zstd frame holding the
+    # offset, and only decompresses and skips the rest of that member.
+    # Returns None if the object was replaced since the checkpoint.
+    bucket, key = job['bucket'], job['key']
+    offset = job.get('offset', 0)
+    fmt, compression = input_format(key)
+    if (compression == 'zstd' and zstandard is None) or (fmt == 'parquet' and pq is None):
+        raise RuntimeError(f"{key}: {'zstandard' if compression == 'zstd' else 'pyarrow'} is not available in this runtime")
+    request = {'Bucket': bucket, 'Key': key}
+    if offset:
+        # IfMatch makes sure the object is the one the checkpoint was taken on
+        request['IfMatch'] = job['etag']
+        if fmt != 'parquet' and not compression:
+            request['Range'] = f"bytes={offset}-"
+        elif compression and job.get('member', [0, 0])[0]:
+            request['Range'] = f"bytes={job['member'][0]}-"
+    try:
+        if fmt == 'parquet':
+            response = s3.head_object(**request)
+        else:
+            response = s3.get_object(**request)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('PreconditionFailed', '412'):
+            raise
+        return None
+    if not offset:
+        job['etag'] = response['ETag']
+
+    position = {}
+    if fmt == 'parquet':
+        rows = parquet_rows(bucket, key, position, offset)
+        if not offset:
+            job['size'] = None  # the row count is only known once the footer is read
+        return rows, position, None
+
+    body = response['Body']
+    if compression:
+        member = tuple(job.get('member', (0, 0)))
+        position.update(offset=member[1], members=[member])
+        decompress = gunzip_chunks if compression == 'gzip' else unzstd_chunks
+        chunks = watch_skip(decompress(body.iter_chunks(READ_CHUNK_SIZE), position), position, offset, context, key)
+        lines = iter_lines(chunks, position=position, skip_to=offset)
+    else:
+        position['offset'] = offset
+        lines = iter_lines(body.iter_chunks(READ_CHUNK_SIZE), position=position)
+    if not offset:
+        # Ranged reads end at the object size; the decompressed size is unknown
+        job['size'] = None if compression else response['ContentLength']
+    if fmt == 'ndjson':
+        return ndjson_rows(lines), position, body
+    return csv.DictReader(lines, fieldnames=job.get('fieldnames')), position, body
+
+def resume_point(reader, position, offset=0):
+    # Checkpoint fields for a continuation that starts right after the last row read from open_rows
+    point = {
+        'offset': position.get('offset', offset),
+        'fieldnames': getattr(reader, 'fieldnames', None),  # CSV header, reused when resuming
+    }
+    if 'members' in position:
+        point['member'] = list(member_at(position, point['offset']))
+    return point
+
+def parse_row(row):
+    item_data = {}
+    for k, v in row.items():
+        if not k: continue
+        k_lower = k.strip().lower()
+        v = '' if v is None else str(v).strip()  # short CSV rows leave None; NDJSON/Parquet give typed values
+        if k_lower in ['store', 'tienda']:
+            item_data['Store'] = v
+        elif k_lower in ['item', 'articulo', 'artículo']:
+            item_data['Item'] = v
+        elif k_lower in ['count', 'cantidad']:
+            try:
+                item_data['Count'] = int(v)
+            except ValueError:
+                item_data['Count'] = 0
+    return item_data
+
+class ParallelWriter:
+    # Spreads items over WRITE_CONCURRENCY threads, each sending its own BatchWriteItem requests.
+    # Items are partitioned by key, so repeated (Store, Item) rows keep their file order.
+    def __init__(self, concurrency, queue_size=1000):
+        self._client = table.meta.client  # clients are thread-safe, resources are not
+        self._queues = [queue.Queue(queue_size) for _ in range(concurrency)]
+        self._threads = [threading.Thread(target=self._run, args=(q,), daemon=True) for q in self._queues]
+        self._lock = threading.Lock()
+        self.error = None
+        self.written = 0
+        self.skipped = 0
+        self.retries = 0
+        for t in self._threads:
+            t.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, item):
+        if self.error:
+            raise self.error
+        # Bounded queues: parsing pauses when the writers fall behind
+        self._queues[hash((item['Store'], item['Item'])) % len(self._queues)].put(item)
+
+    def close(self):
+        for q in self._queues:
+            q.put(None)
+        for t in self._threads:
+            t.join()
+        if self.error:
+            raise self.error
+
+    def _run(self, q):
+        batch = {}
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            if self.error:
+                continue  # keep draining so put() never blocks on a dead writer
+            # BatchWriteItem rejects duplicate keys in one request: the later row wins
+            key = (item['Store'], item['Item'])
+            if key in batch:
+                with self._lock:
+                    self.skipped += 1
+            batch[key] = item
+            if len(batch) == BATCH_SIZE:
+                self._send(list(batch.values()))
+                batch = {}
+        if batch and not self.error:
+            self._send(list(batch.values()))
+
+    def _send(self, items):
+        try:
+            changed = self._changed(items) if SKIP_UNCHANGED else items
+            if changed:
+                def put(requests):
+                    response = self._client.batch_write_item(RequestItems={TABLE_NAME: requests})
+                    return response.get('UnprocessedItems', {}).get(TABLE_NAME, [])
+                self._retry(put, [{'PutRequest': {'Item': item}} for item in changed])
+            with self._lock:
+                self.written += len(changed)
+                self.skipped += len(items) - len(changed)
+        except Exception as e:
+            self.error = e
+
+    def _changed(self, items):
+        # A read costs a fraction of a write and leaves the stream quiet. Reads are strongly consistent:
+        # repeated keys always land on this thread, so an earlier row of the same file is already visible.
+        existing = {}
+        def get(keys):
+            response = self._client.batch_get_item(RequestItems={TABLE_NAME: {'Keys': keys, 'ConsistentRead': True}})
+            for item in response.get('Responses', {}).get(TABLE_NAME, []):
+                existing[(item['Store'], item['Item'])] = item
+            return response.get('UnprocessedKeys', {}).get(TABLE_NAME, {}).get('Keys', [])
+        self._retry(get, [{'Store': item['Store'], 'Item': item['Item']} for item in items])
+        return [item for item in items if existing.get((item['Store'], item['Item'])) != item]
+
+    def _retry(self, send, requests):
+        # send() returns the requests DynamoDB left unprocessed
+        attempt = 0
+        while True:
+            requests = send(requests)
+            if not requests:
+                return
+            attempt += 1
+            if attempt > WRITE_MAX_RETRIES:
+                raise RuntimeError(f"{len(requests)} requests still unprocessed after {WRITE_MAX_RETRIES} retries")
+            with self._lock:
+                self.retries += 1
+            # Exponential backoff with full jitter, capped at 5s
+            time.sleep(random.uniform(0, min(5.0, 0.05 * 2 ** attempt)))
+
+def load_object(job, context):
+    # Loads one S3 object starting at job['offset']. Returns the updated job (the checkpoint) if it had
+    # to stop before the Lambda deadline, None once the whole file is written.
+    key = job['key']
+    opened = open_rows(job, context)
+    if opened is None:
+        print(f"{key} changed since the checkpoint at {job['offset']}; its own upload event reloads it")
+        return None
+    reader, position, body = opened
+
+    start = time.monotonic()
+    rows = 0
+    invalid = 0
+    stopped = False
+    with ParallelWriter(WRITE_CONCURRENCY) as writer:
+        for row in reader:
+            item_data = parse_row(row)
+            rows += 1
+
+            if 'Store' in item_data and 'Item' in item_data:
+                if item_data.get('Count', 0) <= LOW_STOCK_THRESHOLD:
+                    item_data['LowStockStore'] = item_data['Store']
+                writer.put(item_data)
+            else:
+                invalid += 1
+                print(f"Skipping invalid row: {row}")
+
+            if rows % PROGRESS_EVERY == 0:
+                elapsed = time.monotonic() - start
+                print(f"{key}: {job.get('rows', 0) + rows} rows read, {writer.written} written, "
+                      f"{writer.skipped} unchanged ({rows / elapsed:.0f} rows/s)")
+
+            if context and context.get_remaining_time_in_millis() < CHECKPOINT_MARGIN_MS:
+                stopped = True
+                break
+    # Leaving the with block flushed every queued row, so everything before the offset is written
+    if body is not None:
+        body.close()
+
+    elapsed = time.monotonic() - start
+    job.update(
+        resume_point(reader, position, job.get('offset', 0)),
+        rows=job.get('rows', 0) + rows,
+        written=job.get('written', 0) + writer.written,
+        skipped=job.get('skipped', 0) + writer.skipped,
+        invalid=job.get('invalid', 0) + invalid,
+        retries=job.get('retries', 0) + writer.retries,
+        seconds=job.get('seconds', 0) + elapsed,
+        segments=job.get('segments', 0) + 1,
+    )
+    print(f"{key}: segment {job['segments']} read {rows} rows in {elapsed:.1f}s "
+          f"({rows / max(elapsed, 1e-9):.0f} rows/s), {writer.written} written, {writer.skipped} unchanged, "
+          f"checkpoint {job['offset']}" + (f" of {job['size']}" if job['size'] is not None else ""))
+    if stopped and (job['size'] is None or job['offset'] < job['size']):
+        return job
+
+    print(f"Loaded {key}: {job['rows']} rows, {job['written']} items written, {job['skipped']} unchanged "
+          f"or repeated rows skipped, {job['invalid']} invalid rows, {job['retries']} retried batches "
+          f"in {job['seconds']:.1f}s over {job['segments']} invocation(s) "
+          f"({job['rows'] / max(job['seconds'], 1e-9):.0f} rows/s)")
+    return None
 
 def lambda_handler(event, context):
     print("Received event: " + json.dumps(event, indent=2))
 
     try:
-        for record in event['Records']:
-            bucket = record['s3']['bucket']['name']
-            key = urllib.parse.unquote_plus(record['s3']['object']['key'], encoding='utf-8')
-            
-            print(f"Processing file: {key} from bucket: {bucket}")
-            
-            response = s3.get_object(Bucket=bucket, Key=key)
-            content = response['Body'].read().decode('utf-8')
-            
-            csv_reader = csv.DictReader(io.StringIO(content))
-            
-            with table.batch_writer() as batch:
-                for row in csv_reader:
-                    item_data = {}
-                    for k, v in row.items():
-                        if not k: continue
-                        k_lower = k.strip().lower()
-                        if k_lower in ['store', 'tienda']:
-                            item_data['Store'] = v.strip()
-                        elif k_lower in ['item', 'articulo', 'artículo']:
-                            item_data['Item'] = v.strip()
-                        elif k_lower in ['count', 'cantidad']:
-                            try:
-                                item_data['Count'] = int(v.strip())
-                            except ValueError:
-                                item_data['Count'] = 0
-                    
-                    if 'Store' in item_data and 'Item' in item_data:
-                        batch.put_item(Item=item_data)
-                        print(f"Added item: {item_data}")
-                    else:
-                        print(f"Skipping invalid row: {row}")
+        # S3 notifications carry Records; continuations carry the pending Jobs, the first one checkpointed
+        jobs = event.get('Jobs') or [
+            {'bucket': record['s3']['bucket']['name'],
+             'key': urllib.parse.unquote_plus(record['s3']['object']['key'], encoding='utf-8')}
+            for record in event['Records']
+        ]
+        for i, job in enumerate(jobs):
+            print(f"Processing file: {job['key']} from bucket: {job['bucket']}"
+                  + (f" from checkpoint {job['offset']}" if job.get('offset') else ""))
+
+            checkpoint = load_object(job, context)
+            if checkpoint:
+                # Async self-invocation: the next run starts at the checkpoint with a fresh timeout
+                lambda_client.invoke(
+                    FunctionName=context.invoked_function_arn,
+                    InvocationType='Event',
+                    Payload=json.dumps({'Jobs': [checkpoint] + jobs[i + 1:]}),
+                )
+                print(f"Checkpoint {checkpoint['key']} at {checkpoint['offset']}, continuing in a new invocation")
+                return {
+                    'statusCode': 202,
+                    'body': json.dumps(f"Checkpointed {checkpoint['key']} at {checkpoint['offset']}")
+                }
 
         return {
             'statusCode': 200,
@@ -4,11 +4,18 @@ import os
 
 sns = boto3.client('sns')
 TOPIC_ARN = os.environ.get('TOPIC_ARN')
+# Optional: version counter read by get_inventory_api to drop its cached pages when inventory changes
+META_TABLE = os.environ.get('META_TABLE')
+meta_table = boto3.resource('dynamodb').Table(META_TABLE) if META_TABLE else None
 
 def lambda_handler(event, context):
     print("Received event:", json.dumps(event))
     
+    changed = False
     for record in event.get('Records', []):
+        if record['dynamodb'].get('OldImage') != record['dynamodb'].get('NewImage'):
+            changed = True
+
         if record['eventName'] in ['INSERT', 'MODIFY']:
             new_image = record['dynamodb']['NewImage']
             
@@ -37,6 +44,17 @@ def lambda_handler(event, context):
                         print(f"Error sending SNS: {e}")
                 else:
                     print("TOPIC_ARN not configured.")
+
+    if changed and meta_table:
+        # One bump per stream batch, not per record
+        try:
+            meta_table.update_item(
+                Key={'Name': 'cache'},
+                UpdateExpression='ADD Version :one',
+                ExpressionAttributeValues={':one': 1}
+            )
+        except Exception as e:
+            print(f"Error bumping cache version: {e}")
             
     return {
         'statusCode': 200,